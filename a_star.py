@@ -1,31 +1,81 @@
 """
 A* is a graph traversal algorithm, here used to solve n-puzzles
 Its main drawback is its memory use (as it stores all generated nodes).
+`streaming_search()` reduces it by keeping only the opened nodes in memory.
 """
 
 import heapq
 import time
 
-from typing import Any
-from dataclass import Puzzle, Node
+from typing import Any, Callable, Optional, Sequence
+from checkpoint import Checkpointer, SearchState
+from dataclass import GoalContext, Puzzle, Node
+from moves import MOVE_LETTERS, NO_MOVE, get_move_offsets, replay_moves
 
 
-def swap_tile(grid: tuple[int, ...], move: int) -> tuple[int, ...]:
+# The `batch()` method of a batch heuristic (see `dataclass.BatchHeuristicCallback`),
+# resolved once per search: `isinstance()` on a runtime-checkable Protocol is slow
+HeuristicBatch = Callable[[int, Sequence[tuple[int, ...]], GoalContext], list[int]]
+
+
+class SearchBudgetExceeded(Exception):
     """
-    Moves the blank tile according to the move given as argument.
+    Raised when the search goes over the node or time budget it was given
     """
-    tile_to_swap: int = grid.index(0) + move
-    value_to_swap: int = grid[tile_to_swap]
 
-    mutable_grid: list[int] = list(grid)
-    mutable_grid[grid.index(0)] = value_to_swap
-    mutable_grid[tile_to_swap] = 0
-    swapped_grid = tuple(mutable_grid)
 
-    return swapped_grid
+def expand_node(  # pylint: disable=too-many-arguments
+    puzzle: Puzzle,
+    opened: list[Node[Any]],
+    current_node: Node[Any],
+    is_closed: Callable[[tuple[int, ...]], bool],
+    path_cost_increment: int,
+    batch: Optional[HeuristicBatch],
+    keep_parent: bool = True,
+) -> None:
+    """
+    Pushes the children of `current_node` in `opened`, except the closed ones.
+    The move undoing the last one is skipped, since it would only lead back to the parent.
+    With a batch heuristic, h(n) is computed for all the children in a single call.
+    """
+    children: list[tuple[tuple[int, ...], int, int]] = []
+    for move, next_blank, swap in puzzle.swaps[current_node.blank]:
+        if move == -current_node.last_move:
+            continue
+        next_grid = swap(current_node.grid)
+        if is_closed(next_grid):
+            continue
+        children.append((next_grid, next_blank, move))
+
+    heuristic_costs = [-1] * len(children)
+    if batch is not None:
+        heuristic_costs = batch(
+            puzzle.size, [child[0] for child in children], puzzle.context
+        )
+
+    for (next_grid, next_blank, move), heuristic_cost in zip(children, heuristic_costs):
+        heapq.heappush(
+            opened,
+            Node(
+                puzzle,
+                current_node if keep_parent else None,
+                next_grid,
+                current_node.path_cost + path_cost_increment,
+                heuristic_cost,
+                next_blank,
+                move,
+            ),
+        )
 
 
-def solve(puzzle: Puzzle, greedy_search: bool) -> tuple[float, list[tuple[int, ...]]]:
+def search(  # pylint: disable=too-many-locals,too-many-branches,too-many-arguments
+    puzzle: Puzzle,
+    greedy_search: bool,
+    max_nodes: Optional[int] = None,
+    time_limit: Optional[float] = None,
+    checkpointer: Optional[Checkpointer] = None,
+    resume: Optional[SearchState] = None,
+) -> tuple[list[tuple[int, ...]], int, int]:
     """
     Our A* implementation:
     - `visited` is a set to make sure there are no duplicate nodes in it
@@ -33,20 +83,27 @@ def solve(puzzle: Puzzle, greedy_search: bool) -> tuple[float, list[tuple[int, .
     - `time_complexity` is the total number of states ever selected in opened
     - `size_complexity` is the maximum number of states ever represented in memory
 
-    Returns two values:
-    - the time spent to solve the puzzle
-    - the list of all the moves uesd to solve the puzzle
+    `max_nodes` and `time_limit` (in seconds of CPU time) are optional budgets:
+    going over one of them raises `SearchBudgetExceeded`.
+    `checkpointer` periodically saves the search state (see `checkpoint.py`),
+    and `resume` is a saved search state to start from.
+
+    Returns three values:
+    - the list of all the moves used to solve the puzzle
+    - the time complexity
+    - the size complexity
     """
-    time_before_solve = time.process_time()
-    visited: set[tuple[int, ...]] = set()
-    starting_node: Node[Any] = Node(puzzle, None, puzzle.start, 0)
-    opened: list[Node[Any]] = []
-    heapq.heappush(opened, starting_node)
+    time_before_search = time.process_time()
+    if resume is None:
+        resume = SearchState([Node(puzzle, None, puzzle.start, 0)], set(), 0, 1)
+    visited: set[tuple[int, ...]] = resume.visited
+    opened: list[Node[Any]] = resume.opened
     path_cost_increment: int = 1
     if greedy_search:
         path_cost_increment = 0
-    time_complexity: int = 0
-    size_complexity: int = 1
+    time_complexity: int = resume.time_complexity
+    size_complexity: int = resume.size_complexity
+    batch: Optional[HeuristicBatch] = getattr(puzzle.heuristic, "batch", None)
 
     while opened:
         current_node: Node[Any] = heapq.heappop(opened)
@@ -57,26 +114,39 @@ def solve(puzzle: Puzzle, greedy_search: bool) -> tuple[float, list[tuple[int, .
             continue
         visited.add(current_node.grid)
 
-        valid_moves_for_zero = puzzle.valid_moves[current_node.grid.index(0)]
-        for move in valid_moves_for_zero:
-            next_grid = swap_tile(current_node.grid, move)
-
-            if next_grid in visited:
-                continue
-            heapq.heappush(
-                opened,
-                Node(
-                    puzzle,
-                    current_node,
-                    next_grid,
-                    current_node.path_cost + path_cost_increment,
-                ),
-            )
+        if max_nodes is not None and time_complexity > max_nodes:
+            raise SearchBudgetExceeded(f"more than {max_nodes:,} nodes were expanded")
+        # Checking the clock is comparatively slow, so it's only done every 1024 nodes
+        if time_limit is not None and time_complexity % 1024 == 0:
+            if time.process_time() - time_before_search > time_limit:
+                raise SearchBudgetExceeded(f"the {time_limit}s time limit was reached")
+
+        expand_node(
+            puzzle,
+            opened,
+            current_node,
+            visited.__contains__,
+            path_cost_increment,
+            batch,
+        )
 
         if size_complexity < len(opened) + len(visited):
             size_complexity = len(opened) + len(visited)
 
-    time_after_solve = time.process_time()
+        if checkpointer is not None and time_complexity % 1024 == 0:
+            checkpointer.update(
+                puzzle,
+                SearchState(
+                    opened,
+                    visited,
+                    time_complexity,
+                    size_complexity,
+                    resume.elapsed + time.process_time() - time_before_search,
+                ),
+            )
+
+    if checkpointer is not None:
+        checkpointer.finish()
 
     solution: list[tuple[int, ...]] = []
     while current_node.parent:
@@ -85,24 +155,113 @@ def solve(puzzle: Puzzle, greedy_search: bool) -> tuple[float, list[tuple[int, .
     solution.append(puzzle.start)
     solution.reverse()
 
-    print_solution(solution, time_complexity, size_complexity)
+    return (solution, time_complexity, size_complexity)
+
 
-    return (time_after_solve - time_before_solve, solution)
+def rebuild_moves(puzzle: Puzzle, closed: dict[bytes, int], goal_move: int) -> str:
+    """
+    Follows the moves stored in the closed set backwards, from the goal to the start
+
+    Returns the moves of the blank tile (see `moves.py`)
+    """
+    move_offsets = get_move_offsets(puzzle.size)
+    grid = list(puzzle.goal)
+    blank = grid.index(0)
+    move = goal_move
+    letters: list[str] = []
+
+    while move != NO_MOVE:
+        letters.append(MOVE_LETTERS[move])
+        previous_blank = blank - move_offsets[move]
+        grid[blank], grid[previous_blank] = grid[previous_blank], 0
+        blank = previous_blank
+        move = closed[bytes(grid)]
+
+    letters.reverse()
+    return "".join(letters)
+
+
+def streaming_search(  # pylint: disable=too-many-locals
+    puzzle: Puzzle,
+    greedy_search: bool,
+    max_nodes: Optional[int] = None,
+    time_limit: Optional[float] = None,
+) -> tuple[str, int, int]:
+    """
+    The same A* as `search()`, but the nodes don't keep a reference to their parent:
+    an expanded node is freed as soon as its children are generated.
+    Instead, `closed` maps each expanded state (packed in bytes) to the code
+    of the move that led to it, which is enough to rebuild the path backwards.
+
+    Returns the same values as `search()`, except that the solution is the string
+    of moves of the blank tile: its grids can be generated lazily with `replay_moves()`.
+    Checkpoints aren't available, since they are made of the chains of nodes.
+    """
+    time_before_search = time.process_time()
+    move_codes = {
+        offset: code for code, offset in enumerate(get_move_offsets(puzzle.size))
+    }
+    closed: dict[bytes, int] = {}
+    opened: list[Node[Any]] = [Node(puzzle, None, puzzle.start, 0)]
+    path_cost_increment: int = 0 if greedy_search else 1
+    time_complexity: int = 0
+    size_complexity: int = 1
+    batch: Optional[HeuristicBatch] = getattr(puzzle.heuristic, "batch", None)
+
+    while opened:
+        current_node: Node[Any] = heapq.heappop(opened)
+        time_complexity += 1
+        if current_node.grid == puzzle.goal:
+            break
+        state = bytes(current_node.grid)
+        if state in closed:
+            continue
+        closed[state] = move_codes.get(current_node.last_move, NO_MOVE)
+
+        if max_nodes is not None and time_complexity > max_nodes:
+            raise SearchBudgetExceeded(f"more than {max_nodes:,} nodes were expanded")
+        if time_limit is not None and time_complexity % 1024 == 0:
+            if time.process_time() - time_before_search > time_limit:
+                raise SearchBudgetExceeded(f"the {time_limit}s time limit was reached")
+
+        expand_node(
+            puzzle,
+            opened,
+            current_node,
+            lambda grid: bytes(grid) in closed,
+            path_cost_increment,
+            batch,
+            keep_parent=False,
+        )
+
+        if size_complexity < len(opened) + len(closed):
+            size_complexity = len(opened) + len(closed)
+
+    moves = rebuild_moves(
+        puzzle, closed, move_codes.get(current_node.last_move, NO_MOVE)
+    )
+    return (moves, time_complexity, size_complexity)
 
 
 def print_solution(
-    solution: list[tuple[int, ...]], time_complexity: int, size_complexity: int
+    size: int,
+    start: tuple[int, ...],
+    moves: str,
+    time_complexity: int,
+    size_complexity: int,
 ) -> None:
     """
-    Print the solution to the puzzle (ie all the required moves)
-    and the complexity metrics (in time and size)
+    Print the solution to the puzzle (ie all the required moves, also as a string
+    that can be replayed with `--replay`) and the complexity metrics (in time and size).
+    The grids are generated one at a time from the moves.
     """
     print("\033[32;1m🎉 The puzzle was solved 🎉\033[m")
     print(
-        f"\033[35;1m{len(solution)-1:,} moves\033[m were necessary to get to the solution:"
+        f"\033[35;1m{len(moves):,} moves\033[m were necessary to get to the solution:"
     )
-    for move in solution:
-        print(f"\t{move}")
+    for grid in replay_moves(size, start, moves):
+        print(f"\t{grid}")
+    print(f"Moves of the blank tile: {moves}")
     print(
         f"""Time complexity = \033[33;1m{time_complexity
         :,}\033[m | Size complexity = \033[33;1m{size_complexity:,}\033[m"""
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3.9
+
+"""
+Compares the solver engines and heuristics on the same puzzles,
+eg `./benchmark.py puzzles/ok/4-random_*.txt --engines astar external`.
+
+Every run is done in a fresh process, so that its memory peak doesn't depend
+on the runs before it. The results are printed as a Markdown table,
+where the moves are compared with the shortest solution found for each puzzle.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Union
+
+from a_star import SearchBudgetExceeded
+from engines import ENGINES, SolverOptions, SolverResult, run_engine
+from heuristics import select_heuristic
+from parsing import parsing_main
+
+HEURISTIC_NAMES = {
+    "uniform": "Uniform",
+    "hamming": "Hamming",
+    "manhattan": "Manhattan",
+    "linear": "Linear",
+}
+
+
+@dataclass(frozen=True)
+class Run:
+    """
+    One engine and one heuristic, on one puzzle
+    """
+
+    path: str
+    engine: str
+    heuristic: str
+    vectorized: bool = False
+
+    def describe_heuristic(self) -> str:
+        """
+        Returns the name of the heuristic, as shown in the table
+        """
+        name = HEURISTIC_NAMES[self.heuristic]
+        return f"{name} (NumPy)" if self.vectorized else name
+
+
+def execute_run(
+    run: Run, shape: str, options: SolverOptions
+) -> Union[SolverResult, str]:
+    """
+    Solves the puzzle of a run (this runs in its own process).
+
+    Returns the result, or the reason why the puzzle wasn't solved.
+    Any error is reported in the table instead of stopping the whole comparison.
+    """
+    try:
+        with open(run.path, "r") as file:
+            puzzle = parsing_main(file.read(), shape)
+        if run.vectorized:
+            # NumPy is an optional dependency, only needed for --vectorized
+            # pylint: disable=import-outside-toplevel
+            from vectorized_heuristics import VectorizedHeuristic
+
+            puzzle.heuristic = VectorizedHeuristic(run.heuristic)
+        else:
+            puzzle.heuristic = select_heuristic(run.heuristic)
+        return run_engine(run.engine, puzzle, options)
+    except SearchBudgetExceeded:
+        return "budget exceeded"
+    except ValueError as exc:
+        return str(exc)
+    except Exception as exc:  # pylint: disable=broad-except
+        return f"{type(exc).__name__}: {exc}"
+
+
+def format_number(number: int) -> str:
+    """
+    Formats a number like in the tables of the README (eg 146 310)
+    """
+    return f"{number:,}".replace(",", " ")
+
+
+def format_row(run: Run, outcome: Union[SolverResult, str], shortest: int) -> list[str]:
+    """
+    Returns the cells of a row of the table
+    """
+    if isinstance(outcome, str):
+        return ["", run.engine, run.describe_heuristic(), outcome, "", "", "", "", ""]
+
+    moves = format_number(outcome.moves)
+    if outcome.moves > shortest:
+        moves += f" (+{outcome.moves - shortest})"
+    return [
+        "",
+        run.engine,
+        run.describe_heuristic(),
+        moves,
+        format_number(outcome.time_complexity),
+        format_number(outcome.size_complexity),
+        f"{outcome.time_to_solve:.2f}s",
+        format_number(round(outcome.nodes_per_second)),
+        f"{outcome.memory_peak / 2 ** 20:.1f} MiB",
+    ]
+
+
+def print_table(outcomes: dict[Run, Union[SolverResult, str]]) -> None:
+    """
+    Prints the results of all the runs, grouped by puzzle
+    """
+    rows = [
+        [
+            "Puzzle",
+            "Engine",
+            "Heuristic",
+            "Moves",
+            "Time complexity",
+            "Size complexity",
+            "CPU time",
+            "Nodes/s",
+            "Memory peak",
+        ]
+    ]
+    for path in dict.fromkeys(run.path for run in outcomes):
+        runs = [run for run in outcomes if run.path == path]
+        solved = [
+            outcome.moves
+            for outcome in (outcomes[run] for run in runs)
+            if isinstance(outcome, SolverResult)
+        ]
+        rows.append([os.path.basename(path)] + [""] * 8)
+        for run in runs:
+            rows.append(format_row(run, outcomes[run], min(solved, default=0)))
+
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    rows.insert(1, ["-" * width for width in widths])
+    for row in rows:
+        cells = (cell.ljust(width) for cell, width in zip(row, widths))
+        print(f"| {' | '.join(cells)} |")
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parses the command line arguments
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", help="the .txt puzzles to be solved", nargs="+")
+    parser.add_argument(
+        "-e",
+        "--engines",
+        help="the engines to compare (default: astar)",
+        nargs="+",
+        choices=tuple(ENGINES),
+        default=["astar"],
+    )
+    parser.add_argument(
+        "--heuristics",
+        help="the heuristics to compare (default: manhattan linear)",
+        nargs="+",
+        choices=tuple(HEURISTIC_NAMES),
+        default=["manhattan", "linear"],
+    )
+    parser.add_argument(
+        "--vectorized",
+        help="also run each heuristic with NumPy",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--shape",
+        type=str,
+        help="the shape of the goal",
+        choices=("ascending", "descending", "spiral"),
+        default="spiral",
+    )
+    parser.add_argument(
+        "-g",
+        "--greedy",
+        help="make the search greedy (ignore path cost)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--max-nodes", help="maximum number of nodes expanded per run", type=int
+    )
+    parser.add_argument(
+        "--time-limit", help="maximum CPU time (in seconds) per run", type=float
+    )
+    parser.add_argument(
+        "--external",
+        help="where the external engine stores its files",
+        metavar="DIR",
+        default=tempfile.gettempdir(),
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """
+    Validates all the puzzles first, then runs every combination of puzzle,
+    engine and heuristic in its own process
+    """
+    args = parse_arguments()
+    for path in args.files:
+        try:
+            with open(path, "r") as file:
+                parsing_main(file.read(), args.shape)
+        except OSError as exc:
+            sys.exit(f"\033[31;1mError when opening {path}: {exc}\033[m")
+
+    options = SolverOptions(
+        args.greedy, args.max_nodes, args.time_limit, directory=args.external
+    )
+    runs = [
+        Run(path, engine, heuristic, vectorized)
+        for path in args.files
+        for engine in args.engines
+        for heuristic in args.heuristics
+        for vectorized in ((False, True) if args.vectorized else (False,))
+    ]
+
+    # "spawn" starts from a new interpreter, with nothing inherited from this one
+    context = multiprocessing.get_context("spawn")
+    outcomes: dict[Run, Union[SolverResult, str]] = {}
+    for index, run in enumerate(runs, 1):
+        print(
+            f"[{index}/{len(runs)}] {os.path.basename(run.path)}: "
+            f"{run.engine} with {run.describe_heuristic()}",
+            file=sys.stderr,
+        )
+        try:
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                outcomes[run] = executor.submit(
+                    execute_run, run, args.shape, options
+                ).result()
+        except BrokenProcessPool:
+            # Most likely killed by the system for using too much memory
+            outcomes[run] = "the process was killed"
+
+    print_table(outcomes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Periodic checkpoints of the A* search, so that a long search can be resumed
+after an interruption.
+
+The checkpoint is written by a forked child process: it gets a copy-on-write
+snapshot of the search, so the search itself only pauses for the `fork()`.
+On platforms without `fork()`, the checkpoint is written synchronously.
+
+File format (little-endian, one byte per tile):
+- header: magic, size, greedy, time complexity, size complexity, elapsed time,
+  length of the heuristic name, number of nodes, of opened nodes and of visited states
+- the heuristic name, the starting grid and the goal
+- the nodes: all their grids, then their parent index (-1 for none),
+  their path cost, their heuristic cost and their last move (a signed byte, 0 for none)
+- the index of each opened node (in heap order)
+- all the visited states
+"""
+
+import errno
+import os
+import struct
+import sys
+import time
+
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Iterable, Optional
+
+from dataclass import Node, Puzzle, build_goal_context
+
+MAGIC = b"NPUZZLE2"
+HEADER = struct.Struct("<8sH?QQdHQQQ")
+# Exit code of the writer process when it failed without an errno
+UNKNOWN_ERROR = 255
+BUFFER_SIZE = 1 << 20
+
+
+@dataclass
+class SearchState:
+    """
+    Everything needed to resume the search where it stopped
+    """
+
+    opened: list[Node[Any]]
+    visited: set[tuple[int, ...]]
+    time_complexity: int
+    size_complexity: int
+    elapsed: float = 0.0
+
+
+def write_grids(file: BinaryIO, grids: Iterable[tuple[int, ...]]) -> None:
+    """
+    Writes the grids through a fixed-size buffer: joining them would first
+    allocate a bytes object for each of them, in a process short of memory
+    """
+    buffer = bytearray()
+    for grid in grids:
+        buffer += bytes(grid)
+        if len(buffer) >= BUFFER_SIZE:
+            file.write(buffer)
+            buffer.clear()
+    file.write(buffer)
+
+
+def write_checkpoint(  # pylint: disable=too-many-locals
+    path: str, puzzle: Puzzle, heuristic: str, greedy: bool, state: SearchState
+) -> None:
+    """
+    Serializes the search state, through a temporary file
+    so that a previous checkpoint is never left half-written
+    """
+    index_of: dict[int, int] = {}
+    nodes: list[Node[Any]] = []
+    opened_indexes = array("q")
+    for opened_node in state.opened:
+        chain: list[Node[Any]] = []
+        node: Optional[Node[Any]] = opened_node
+        while node is not None and id(node) not in index_of:
+            chain.append(node)
+            node = node.parent
+        # Ancestors are always stored before their descendants
+        for ancestor in reversed(chain):
+            index_of[id(ancestor)] = len(nodes)
+            nodes.append(ancestor)
+        opened_indexes.append(index_of[id(opened_node)])
+
+    parents = array("q", (index_of[id(n.parent)] if n.parent else -1 for n in nodes))
+    path_costs = array("q", (node.path_cost for node in nodes))
+    heuristic_costs = array("q", (node.heuristic_cost for node in nodes))
+    # Without their last move, resumed nodes would generate its reverse move again
+    last_moves = array("b", (node.last_move for node in nodes))
+    heuristic_name = heuristic.encode()
+
+    with open(path + ".tmp", "wb") as file:
+        file.write(
+            HEADER.pack(
+                MAGIC,
+                puzzle.size,
+                greedy,
+                state.time_complexity,
+                state.size_complexity,
+                state.elapsed,
+                len(heuristic_name),
+                len(nodes),
+                len(opened_indexes),
+                len(state.visited),
+            )
+        )
+        file.write(heuristic_name)
+        file.write(bytes(puzzle.start))
+        file.write(bytes(puzzle.goal))
+        write_grids(file, (node.grid for node in nodes))
+        for values in (
+            parents,
+            path_costs,
+            heuristic_costs,
+            last_moves,
+            opened_indexes,
+        ):
+            values.tofile(file)
+        write_grids(file, state.visited)
+    os.replace(path + ".tmp", path)
+
+
+def load_checkpoint(  # pylint: disable=too-many-locals
+    path: str,
+) -> tuple[Puzzle, str, bool, SearchState]:
+    """
+    Reads a checkpoint written by `write_checkpoint()`.
+    The heuristic callback of the puzzle must then be set from the returned name.
+
+    Returns the puzzle, the name of the heuristic, whether the search is greedy
+    and the state of the search
+    """
+    with open(path, "rb") as file:
+        content = memoryview(file.read())
+
+    (
+        magic,
+        size,
+        greedy,
+        time_complexity,
+        size_complexity,
+        elapsed,
+        name_length,
+        node_count,
+        opened_count,
+        visited_count,
+    ) = HEADER.unpack_from(content)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a checkpoint file")
+    offset = HEADER.size
+    tiles = size * size
+
+    def read(length: int) -> memoryview:
+        nonlocal offset
+        offset += length
+        return content[offset - length : offset]
+
+    heuristic = bytes(read(name_length)).decode()
+    # The goal is stored as is, since it could have been randomly generated
+    puzzle = Puzzle(size, tuple(read(tiles)), "spiral")
+    puzzle.set_context(build_goal_context(size, tuple(read(tiles))))
+
+    def read_array(count: int, typecode: str = "q") -> "array[int]":
+        values = array(typecode)
+        values.frombytes(read(count * values.itemsize))
+        return values
+
+    grids = read(node_count * tiles)
+    parents = read_array(node_count)
+    path_costs = read_array(node_count)
+    heuristic_costs = read_array(node_count)
+    last_moves = read_array(node_count, "b")
+    opened_indexes = read_array(opened_count)
+
+    nodes: list[Node[Any]] = []
+    for index in range(node_count):
+        nodes.append(
+            Node(
+                puzzle,
+                nodes[parents[index]] if parents[index] >= 0 else None,
+                tuple(grids[index * tiles : (index + 1) * tiles]),
+                path_costs[index],
+                heuristic_costs[index],
+                last_move=last_moves[index],
+            )
+        )
+    visited_grids = read(visited_count * tiles)
+    visited = {
+        tuple(visited_grids[index : index + tiles])
+        for index in range(0, len(visited_grids), tiles)
+    }
+
+    state = SearchState(
+        [nodes[index] for index in opened_indexes],
+        visited,
+        time_complexity,
+        size_complexity,
+        elapsed,
+    )
+    return puzzle, heuristic, greedy, state
+
+
+@dataclass
+class Checkpointer:
+    """
+    Writes a checkpoint every `interval` seconds during the search.
+    A new checkpoint is only started once the previous one is written,
+    and a warning is printed when it couldn't be written.
+    """
+
+    path: str
+    heuristic: str
+    greedy: bool
+    interval: float = 60.0
+    last_checkpoint: float = field(default_factory=time.monotonic)
+    writer_pid: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        """
+        Fails before the search starts if the checkpoint can't be written
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.isdir(directory):
+            raise OSError(errno.ENOENT, "no directory for the checkpoint", directory)
+        if not os.access(directory, os.W_OK):
+            raise OSError(errno.EACCES, "can't write the checkpoint", directory)
+
+    def warn(self, reason: str) -> None:
+        """
+        A failed checkpoint doesn't stop the search, but the user must know
+        that there may be nothing to resume from
+        """
+        print(
+            f"\033[33;1mWarning: the checkpoint couldn't be written to {self.path}"
+            f" ({reason})\033[m",
+            file=sys.stderr,
+        )
+
+    def check_writer_status(self, status: int) -> None:
+        """
+        Warns if the writer process didn't exit successfully:
+        its exit code is the errno of the error, when there is one
+        """
+        if not os.WIFEXITED(status):
+            self.warn("the writer process was killed")
+        elif os.WEXITSTATUS(status) == UNKNOWN_ERROR:
+            self.warn("unexpected error")
+        elif os.WEXITSTATUS(status) != 0:
+            self.warn(os.strerror(os.WEXITSTATUS(status)))
+
+    def writer_is_running(self) -> bool:
+        """
+        Checks (without blocking) if the previous checkpoint is still being written
+        """
+        if self.writer_pid is None:
+            return False
+        pid, status = os.waitpid(self.writer_pid, os.WNOHANG)
+        if pid == 0:
+            return True
+        self.writer_pid = None
+        self.check_writer_status(status)
+        return False
+
+    def update(self, puzzle: Puzzle, state: SearchState) -> None:
+        """
+        Starts writing a new checkpoint if the interval has elapsed
+        """
+        if time.monotonic() - self.last_checkpoint < self.interval:
+            return
+        if self.writer_is_running():
+            return
+        self.last_checkpoint = time.monotonic()
+
+        if not hasattr(os, "fork"):
+            try:
+                write_checkpoint(self.path, puzzle, self.heuristic, self.greedy, state)
+            except OSError as exc:
+                self.warn(exc.strerror or str(exc))
+            return
+        self.writer_pid = os.fork()
+        if self.writer_pid == 0:
+            exit_code = 0
+            try:
+                write_checkpoint(self.path, puzzle, self.heuristic, self.greedy, state)
+            except OSError as exc:
+                exit_code = exc.errno if exc.errno else UNKNOWN_ERROR
+            except BaseException:  # pylint: disable=broad-except
+                exit_code = UNKNOWN_ERROR
+            # The child must not run any of the cleanup of the parent process
+            os._exit(exit_code)  # pylint: disable=protected-access
+
+    def finish(self) -> None:
+        """
+        Called once the puzzle is solved: the checkpoint isn't needed anymore
+        """
+        if self.writer_pid is not None:
+            _, status = os.waitpid(self.writer_pid, 0)
+            self.writer_pid = None
+            self.check_writer_status(status)
+        for path in (self.path, self.path + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
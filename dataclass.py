@@ -1,20 +1,55 @@
 """
-Define the Puzzle and Node dataclasses
+Define the GoalContext, Puzzle and Node dataclasses
 """
 
 import random
 
 from dataclasses import InitVar, dataclass, field
+from functools import cache
+from operator import itemgetter
 
 # pylint doesn't detect `Any` usage when declaring the NodeType TypeVar
 from typing import (  # pylint: disable=unused-import
+    Callable,
     Optional,
     Protocol,
+    Sequence,
     TypeVar,
     Generic,
     Any,
+    runtime_checkable,
 )
 
+# The move, the next position of the blank tile and the function building the next grid
+Swap = tuple[int, int, Callable[[tuple[int, ...]], tuple[int, ...]]]
+
+
+@dataclass(frozen=True, eq=False)
+class GoalContext:  # pylint: disable=too-many-instance-attributes
+    """
+    Everything that only depends on the goal (and the size), computed once
+    and shared by all the puzzles and heuristics with the same goal:
+    - `goal_positions`, `goal_rows` and `goal_cols` give for each tile
+    (used as the index) its position, row and column in the goal
+    - `goal_row_lines` and `goal_col_lines` are the lines of the goal,
+    used to look for linear conflicts
+
+    Data derived from the goal by other modules (eg the NumPy arrays of
+    `vectorized_heuristics.py`) is stored lazily in `derived`, so that it is
+    freed with the context: random goals create a new context for every puzzle.
+    """
+
+    size: int
+    goal: tuple[int, ...]
+    goal_positions: tuple[int, ...]
+    goal_rows: tuple[int, ...]
+    goal_cols: tuple[int, ...]
+    goal_row_lines: tuple[tuple[int, ...], ...]
+    goal_col_lines: tuple[tuple[int, ...], ...]
+    valid_moves: tuple[tuple[int, ...], ...]
+    swaps: tuple[tuple[Swap, ...], ...] = field(repr=False)
+    derived: dict[str, Any] = field(default_factory=dict, repr=False)
+
 
 class HeuristicCallback(Protocol):  # pylint: disable=too-few-public-methods
     """
@@ -24,10 +59,27 @@ class HeuristicCallback(Protocol):  # pylint: disable=too-few-public-methods
     for the `heuristic` field of the `Puzzle` dataclass
     """
 
-    def __call__(self, size: int, grid: tuple[int, ...], goal: tuple[int, ...]) -> int:
+    def __call__(self, size: int, grid: tuple[int, ...], context: GoalContext) -> int:
         pass
 
 
+@runtime_checkable
+class BatchHeuristicCallback(
+    HeuristicCallback, Protocol
+):  # pylint: disable=too-few-public-methods
+    """
+    A heuristic that can also evaluate several grids in a single call
+    (see `vectorized_heuristics.py`)
+    """
+
+    def batch(
+        self, size: int, grids: Sequence[tuple[int, ...]], context: GoalContext
+    ) -> list[int]:
+        """
+        Returns h(n) for each of the grids
+        """
+
+
 @dataclass
 class Puzzle:
     """
@@ -36,17 +88,27 @@ class Puzzle:
 
     size: int
     start: tuple[int, ...]
+    context: GoalContext = field(init=False, repr=False)
     goal: tuple[int, ...] = field(init=False)
     valid_moves: tuple[tuple[int, ...], ...] = field(init=False)
+    swaps: tuple[tuple[Swap, ...], ...] = field(init=False, repr=False)
     heuristic: HeuristicCallback = field(init=False)
     shape: InitVar[str]
 
     def __post_init__(self, shape: str) -> None:
         """
-        Automatically generates the goal and the valid moves based on the size
+        Automatically gets the goal and the valid moves based on the size and shape
         """
-        self.goal = self.generate_goal(self.size, shape)
-        self.valid_moves = self.generate_movelist(self.size)
+        self.set_context(get_goal_context(self.size, shape))
+
+    def set_context(self, context: GoalContext) -> None:
+        """
+        Uses the goal (and everything that depends on it) of the given context
+        """
+        self.context = context
+        self.goal = context.goal
+        self.valid_moves = context.valid_moves
+        self.swaps = context.swaps
 
     @staticmethod
     def generate_goal(size: int, shape: str) -> tuple[int, ...]:
@@ -100,6 +162,66 @@ class Puzzle:
 
         return tuple(movelist)
 
+    @staticmethod
+    def generate_swaps(
+        valid_moves: tuple[tuple[int, ...], ...],
+    ) -> tuple[tuple[Swap, ...], ...]:
+        """
+        For each position of the blank tile, generates (for each valid move)
+        the move, the new position of the blank tile and an `itemgetter`
+        building the next grid directly from the current one (in a single copy)
+        """
+        swaps = []
+        for blank, moves in enumerate(valid_moves):
+            blank_swaps = []
+            for move in moves:
+                indexes = list(range(len(valid_moves)))
+                indexes[blank], indexes[blank + move] = blank + move, blank
+                blank_swaps.append((move, blank + move, itemgetter(*indexes)))
+            swaps.append(tuple(blank_swaps))
+
+        return tuple(swaps)
+
+
+def build_goal_context(size: int, goal: tuple[int, ...]) -> GoalContext:
+    """
+    Precomputes everything that only depends on the goal
+    """
+    goal_positions = [0] * len(goal)
+    for position, tile in enumerate(goal):
+        goal_positions[tile] = position
+    valid_moves = Puzzle.generate_movelist(size)
+
+    return GoalContext(
+        size,
+        goal,
+        tuple(goal_positions),
+        tuple(position // size for position in goal_positions),
+        tuple(position % size for position in goal_positions),
+        tuple(goal[row * size : (row + 1) * size] for row in range(size)),
+        tuple(goal[col::size] for col in range(size)),
+        valid_moves,
+        Puzzle.generate_swaps(valid_moves),
+    )
+
+
+@cache
+def get_cached_goal_context(size: int, shape: str) -> GoalContext:
+    """
+    Only one context is built for each (size, shape)
+    """
+    return build_goal_context(size, Puzzle.generate_goal(size, shape))
+
+
+def get_goal_context(size: int, shape: str) -> GoalContext:
+    """
+    Returns the shared context for a given size and shape.
+    A random goal must be different for each puzzle, so it's never cached.
+    """
+    if shape == "random":
+        return build_goal_context(size, Puzzle.generate_goal(size, shape))
+    return get_cached_goal_context(size, shape)
+
 
 # This is necessary so that mypy knows how to type-check our Node class inside itself
 NodeType = TypeVar("NodeType", bound="Node[Any]")
@@ -116,7 +238,9 @@ class Node(Generic[NodeType]):
     parent: Optional[NodeType]
     grid: tuple[int, ...]
     path_cost: int
-    heuristic_cost: int = field(init=False)
+    heuristic_cost: int = -1
+    blank: int = -1
+    last_move: int = 0
 
     def __lt__(self: NodeType, other: NodeType) -> bool:
         return (
@@ -126,8 +250,13 @@ class Node(Generic[NodeType]):
 
     def __post_init__(self) -> None:
         """
-        Automatically generate h(n) on Node initialisation
+        Automatically generate h(n) on Node initialisation,
+        unless it was already computed (by a batch heuristic).
+        Same thing for the position of the blank tile.
         """
-        self.heuristic_cost = self.puzzle.heuristic(
-            self.puzzle.size, self.grid, self.puzzle.goal
-        )
+        if self.blank < 0:
+            self.blank = self.grid.index(0)
+        if self.heuristic_cost < 0:
+            self.heuristic_cost = self.puzzle.heuristic(
+                self.puzzle.size, self.grid, self.puzzle.context
+            )
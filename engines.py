@@ -0,0 +1,172 @@
+"""
+The solver engines all share the same interface: they take a puzzle and the
+options of the search, and return the solution (as the moves of the blank tile,
+see `moves.py`) with its complexity metrics.
+They are registered in `ENGINES`, and run through `run_engine()` which also
+measures the time and memory they used.
+"""
+
+import sys
+import time
+
+from dataclasses import dataclass
+from typing import Iterator, Optional, Protocol
+
+from a_star import search, streaming_search
+from checkpoint import Checkpointer, SearchState
+from dataclass import Puzzle
+from external_search import external_search
+from moves import replay_moves, solution_to_moves
+
+
+@dataclass
+class SolverOptions:
+    """
+    The options of a search, engines ignore the ones they don't use.
+    `directory` is where the external-memory engine stores its files
+    (the system default if None).
+    """
+
+    greedy: bool = False
+    max_nodes: Optional[int] = None
+    time_limit: Optional[float] = None
+    directory: Optional[str] = None
+    checkpointer: Optional[Checkpointer] = None
+    resume: Optional[SearchState] = None
+
+
+@dataclass
+class SolverResult:  # pylint: disable=too-many-instance-attributes
+    """
+    What a run of an engine produced:
+    - `solution_moves` are the moves of the blank tile from `start` to the goal
+    - `time_to_solve` is in seconds of CPU time (including the time before a checkpoint)
+    - `memory_peak` is the peak resident memory of the process, in bytes
+    """
+
+    engine: str
+    size: int
+    start: tuple[int, ...]
+    solution_moves: str
+    time_complexity: int
+    size_complexity: int
+    time_to_solve: float
+    memory_peak: int
+
+    @property
+    def moves(self) -> int:
+        """
+        The number of moves of the solution
+        """
+        return len(self.solution_moves)
+
+    def solution(self) -> Iterator[tuple[int, ...]]:
+        """
+        Lazily generates all the grids of the solution, from the start to the goal
+        """
+        return replay_moves(self.size, self.start, self.solution_moves)
+
+    @property
+    def nodes_per_second(self) -> float:
+        """
+        The throughput of the search
+        """
+        return self.time_complexity / self.time_to_solve if self.time_to_solve else 0.0
+
+
+class SolverEngine(Protocol):  # pylint: disable=too-few-public-methods
+    """
+    An engine returns the same values as `a_star.streaming_search()`:
+    the moves of the solution, the time complexity and the size complexity
+    """
+
+    def __call__(self, puzzle: Puzzle, options: SolverOptions) -> tuple[str, int, int]:
+        ...
+
+
+def a_star_engine(puzzle: Puzzle, options: SolverOptions) -> tuple[str, int, int]:
+    """
+    The in-memory A* of `a_star.py`
+    """
+    solution, time_complexity, size_complexity = search(
+        puzzle,
+        options.greedy,
+        options.max_nodes,
+        options.time_limit,
+        options.checkpointer,
+        options.resume,
+    )
+    return (solution_to_moves(puzzle.size, solution), time_complexity, size_complexity)
+
+
+def streaming_engine(puzzle: Puzzle, options: SolverOptions) -> tuple[str, int, int]:
+    """
+    The A* of `a_star.py` that doesn't keep the expanded nodes in memory
+    """
+    if options.checkpointer is not None or options.resume is not None:
+        raise ValueError("checkpoints are not supported with streaming")
+    return streaming_search(
+        puzzle, options.greedy, options.max_nodes, options.time_limit
+    )
+
+
+def external_engine(puzzle: Puzzle, options: SolverOptions) -> tuple[str, int, int]:
+    """
+    The external-memory A* of `external_search.py`
+    """
+    if options.checkpointer is not None or options.resume is not None:
+        raise ValueError("checkpoints are not supported with external memory")
+    solution, time_complexity, size_complexity = external_search(
+        puzzle,
+        options.greedy,
+        options.directory,
+        options.max_nodes,
+        options.time_limit,
+    )
+    return (solution_to_moves(puzzle.size, solution), time_complexity, size_complexity)
+
+
+ENGINES: dict[str, SolverEngine] = {
+    "astar": a_star_engine,
+    "streaming": streaming_engine,
+    "external": external_engine,
+}
+
+
+def get_memory_peak() -> int:
+    """
+    Returns the peak resident memory of the process in bytes
+    (0 on platforms where it isn't available)
+    """
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return 0
+    memory_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports it in kilobytes, macOS in bytes
+    return memory_peak if sys.platform == "darwin" else memory_peak * 1024
+
+
+def run_engine(name: str, puzzle: Puzzle, options: SolverOptions) -> SolverResult:
+    """
+    Solves the puzzle with the engine registered under `name`.
+    The memory peak is the one of the whole process: to compare engines,
+    each one must be run in its own process (see `benchmark.py`).
+    """
+    if name not in ENGINES:
+        raise ValueError(f"unknown engine '{name}'")
+    time_before_solve = time.process_time()
+    moves, time_complexity, size_complexity = ENGINES[name](puzzle, options)
+    time_after_solve = time.process_time()
+
+    time_before_resume = options.resume.elapsed if options.resume else 0.0
+    return SolverResult(
+        name,
+        puzzle.size,
+        puzzle.start,
+        moves,
+        time_complexity,
+        size_complexity,
+        time_after_solve - time_before_solve + time_before_resume,
+        get_memory_peak(),
+    )
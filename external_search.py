@@ -0,0 +1,288 @@
+"""
+External-memory A*, for searches whose opened and visited sets don't fit in RAM.
+
+The frontier is split into buckets of states sharing the same g(n) and h(n),
+each stored in its own file and processed in increasing f(n) = g(n) + h(n).
+Only the bucket being expanded is loaded in memory: its children are appended
+to the files of their own buckets, in large sequential writes.
+
+Duplicates are removed when a bucket is expanded (delayed duplicate detection):
+a state always has the same h(n), so the bucket only has to be compared with
+the closed file of its h(n), which is kept sorted so that both can be merged
+in a single sequential pass.
+
+Each record is the state (one byte per tile) followed by the code of the move
+that led to it (see `moves.py`), which is enough to rebuild the path from the
+closed files.
+"""
+
+import os
+import tempfile
+import time
+
+from typing import Iterator, Optional
+from a_star import SearchBudgetExceeded
+from dataclass import BatchHeuristicCallback, Puzzle
+from moves import NO_MOVE, get_move_offsets
+
+BUFFER_SIZE = 1 << 20
+CHUNK_SIZE = 4096
+
+
+def read_records(path: str, record_size: int) -> Iterator[bytes]:
+    """
+    Reads a file of fixed-size records in large sequential batches
+    """
+    if not os.path.exists(path):
+        return
+    batch_size = record_size * (BUFFER_SIZE // record_size)
+    with open(path, "rb") as file:
+        while batch := file.read(batch_size):
+            for index in range(0, len(batch), record_size):
+                yield batch[index : index + record_size]
+
+
+def find_record(path: str, record_size: int, state: bytes) -> bytes:
+    """
+    Binary search of a state in a sorted file of records
+    """
+    with open(path, "rb") as file:
+        low, high = 0, os.path.getsize(path) // record_size
+        while low < high:
+            middle = (low + high) // 2
+            file.seek(middle * record_size)
+            record = file.read(record_size)
+            if record[:-1] < state:
+                low = middle + 1
+            elif record[:-1] > state:
+                high = middle
+            else:
+                return record
+
+    raise LookupError(f"{tuple(state)} is missing from {path}")
+
+
+def merge_with_closed(
+    path: str, record_size: int, bucket: list[tuple[bytes, int]]
+) -> list[tuple[bytes, int]]:
+    """
+    Removes the states already closed from the (sorted) bucket,
+    while merging the remaining ones into the closed file.
+    Both are read and written sequentially.
+
+    Returns the states of the bucket that were never expanded before.
+    """
+    new_states: list[tuple[bytes, int]] = []
+    closed = read_records(path, record_size)
+    closed_record = next(closed, None)
+
+    with open(path + ".tmp", "wb") as merged:
+        buffer = bytearray()
+        for state, move in bucket:
+            while closed_record is not None and closed_record[:-1] < state:
+                buffer += closed_record
+                closed_record = next(closed, None)
+            if closed_record is not None and closed_record[:-1] == state:
+                continue
+            new_states.append((state, move))
+            buffer += state
+            buffer.append(move)
+            if len(buffer) >= BUFFER_SIZE:
+                merged.write(buffer)
+                buffer.clear()
+
+        while closed_record is not None:
+            buffer += closed_record
+            closed_record = next(closed, None)
+        merged.write(buffer)
+
+    os.replace(path + ".tmp", path)
+    return new_states
+
+
+class BucketWriter:
+    """
+    Buffers the records sent to each bucket, and appends them to its file
+    once the buffer is large enough
+    """
+
+    def __init__(self, directory: str, record_size: int) -> None:
+        self.directory = directory
+        self.record_size = record_size
+        self.buffers: dict[tuple[int, int], bytearray] = {}
+        self.buffered_records = 0
+
+    def get_path(self, bucket: tuple[int, int]) -> str:
+        """
+        Returns the path of the file for a (g, h) bucket
+        """
+        return os.path.join(self.directory, f"open_{bucket[0]}_{bucket[1]}.bin")
+
+    def add(self, bucket: tuple[int, int], state: bytes, move: int) -> None:
+        """
+        Appends a record to a bucket
+        """
+        buffer = self.buffers.setdefault(bucket, bytearray())
+        buffer += state
+        buffer.append(move)
+        self.buffered_records += 1
+        if len(buffer) >= BUFFER_SIZE:
+            self.flush(bucket)
+
+    def flush(self, bucket: tuple[int, int]) -> None:
+        """
+        Writes the buffer of a bucket to its file
+        """
+        buffer = self.buffers.pop(bucket, None)
+        if buffer:
+            with open(self.get_path(bucket), "ab") as file:
+                file.write(buffer)
+            self.buffered_records -= len(buffer) // self.record_size
+
+    def pending(self) -> set[tuple[int, int]]:
+        """
+        Returns all the buckets with records waiting to be expanded
+        """
+        buckets = set(self.buffers)
+        for filename in os.listdir(self.directory):
+            if filename.startswith("open_"):
+                g_cost, h_cost = filename[5:-4].split("_")
+                buckets.add((int(g_cost), int(h_cost)))
+        return buckets
+
+
+def rebuild_solution(
+    puzzle: Puzzle, directory: str, goal_move: int
+) -> list[tuple[int, ...]]:
+    """
+    Follows the moves stored in the closed files backwards, from the goal to the start
+    """
+    record_size = puzzle.size * puzzle.size + 1
+    move_offsets = get_move_offsets(puzzle.size)
+    grid = list(puzzle.goal)
+    move = goal_move
+    solution = [puzzle.goal]
+
+    while move != NO_MOVE:
+        blank = grid.index(0)
+        previous_blank = blank - move_offsets[move]
+        grid[blank], grid[previous_blank] = grid[previous_blank], 0
+        solution.append(tuple(grid))
+        heuristic_cost = puzzle.heuristic(puzzle.size, solution[-1], puzzle.context)
+        closed_path = os.path.join(directory, f"closed_{heuristic_cost}.bin")
+        move = find_record(closed_path, record_size, bytes(grid))[-1]
+
+    solution.reverse()
+    return solution
+
+
+def expand(  # pylint: disable=too-many-locals
+    puzzle: Puzzle,
+    writer: BucketWriter,
+    g_cost: int,
+    states: list[tuple[bytes, int]],
+) -> None:
+    """
+    Generates the children of the given states, and sends them to their buckets.
+    The move undoing the one that led to a state is skipped.
+    """
+    move_offsets = get_move_offsets(puzzle.size)
+    children: list[tuple[bytes, int]] = []
+    for state, previous_move in states:
+        blank = state.index(0)
+        for offset in puzzle.valid_moves[blank]:
+            if previous_move != NO_MOVE and offset == -move_offsets[previous_move]:
+                continue
+            child = bytearray(state)
+            child[blank], child[blank + offset] = child[blank + offset], 0
+            children.append((bytes(child), move_offsets.index(offset)))
+
+    grids = [tuple(child) for child, _ in children]
+    if isinstance(puzzle.heuristic, BatchHeuristicCallback):
+        heuristic_costs = puzzle.heuristic.batch(puzzle.size, grids, puzzle.context)
+    else:
+        heuristic_costs = [
+            puzzle.heuristic(puzzle.size, grid, puzzle.context) for grid in grids
+        ]
+
+    for (child_state, move), heuristic_cost in zip(children, heuristic_costs):
+        writer.add((g_cost + 1, heuristic_cost), child_state, move)
+
+
+def external_search(  # pylint: disable=too-many-locals
+    puzzle: Puzzle,
+    greedy_search: bool,
+    directory: Optional[str] = None,
+    max_nodes: Optional[int] = None,
+    time_limit: Optional[float] = None,
+) -> tuple[list[tuple[int, ...]], int, int]:
+    """
+    Our external-memory A* implementation, the files are stored in a temporary
+    directory created inside `directory` (the system default if None).
+    - `time_complexity` is the total number of states expanded
+    - `size_complexity` is the maximum number of states held in memory
+
+    The budgets are the same as for `a_star.search()`,
+    but they are only checked once per bucket.
+
+    Returns the same values as `a_star.search()`
+    """
+    if greedy_search:
+        raise ValueError("greedy search is not supported with external memory")
+    if puzzle.size * puzzle.size > 256:
+        raise ValueError("external memory only supports puzzles up to 16x16")
+
+    record_size = puzzle.size * puzzle.size + 1
+    goal_state = bytes(puzzle.goal)
+    time_complexity: int = 0
+    size_complexity: int = 1
+    time_before_search = time.process_time()
+
+    with tempfile.TemporaryDirectory(prefix="n-puzzle-", dir=directory) as workdir:
+        writer = BucketWriter(workdir, record_size)
+        start_cost = puzzle.heuristic(puzzle.size, puzzle.start, puzzle.context)
+        writer.add((0, start_cost), bytes(puzzle.start), NO_MOVE)
+
+        while pending := writer.pending():
+            # Smallest f(n) first, then largest g(n) (ie closest to the goal)
+            bucket = min(pending, key=lambda g_h: (g_h[0] + g_h[1], -g_h[0]))
+            writer.flush(bucket)
+            bucket_path = writer.get_path(bucket)
+            states = dict(
+                (record[:-1], record[-1])
+                for record in read_records(bucket_path, record_size)
+            )
+            os.remove(bucket_path)
+            size_complexity = max(
+                size_complexity, len(states) + writer.buffered_records
+            )
+
+            if goal_state in states:
+                time_complexity += 1
+                return (
+                    rebuild_solution(puzzle, workdir, states[goal_state]),
+                    time_complexity,
+                    size_complexity,
+                )
+
+            closed_path = os.path.join(workdir, f"closed_{bucket[1]}.bin")
+            new_states = merge_with_closed(
+                closed_path, record_size, sorted(states.items())
+            )
+            del states
+            time_complexity += len(new_states)
+            if max_nodes is not None and time_complexity > max_nodes:
+                raise SearchBudgetExceeded(
+                    f"more than {max_nodes:,} nodes were expanded"
+                )
+            if (
+                time_limit is not None
+                and time.process_time() - time_before_search > time_limit
+            ):
+                raise SearchBudgetExceeded(f"the {time_limit}s time limit was reached")
+            for index in range(0, len(new_states), CHUNK_SIZE):
+                expand(
+                    puzzle, writer, bucket[0], new_states[index : index + CHUNK_SIZE]
+                )
+
+    raise ValueError("the puzzle cannot be solved")
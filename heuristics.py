@@ -2,8 +2,8 @@
 Contains the various heuristics used by A-star to solve the puzzle
 """
 
-from functools import cache
-from dataclass import HeuristicCallback
+from functools import cache, lru_cache
+from dataclass import GoalContext, HeuristicCallback
 
 
 def select_heuristic(
@@ -23,7 +23,7 @@ def select_heuristic(
 
 
 def generate_uniform_cost(  # pylint: disable=unused-argument
-    size: int, grid: tuple[int, ...], goal: tuple[int, ...]
+    size: int, grid: tuple[int, ...], context: GoalContext
 ) -> int:
     """
     Uniform-cost is not really a heuristic, it's in fact the absence of heuristic.
@@ -33,7 +33,7 @@ def generate_uniform_cost(  # pylint: disable=unused-argument
 
 
 def generate_hamming_distance(
-    size: int, grid: tuple[int, ...], goal: tuple[int, ...]
+    size: int, grid: tuple[int, ...], context: GoalContext
 ) -> int:
     """
     The Hamming Distance is the number of tiles not in their final position.
@@ -41,6 +41,7 @@ def generate_hamming_distance(
     The blank tile is ignored, to ensure that this heuristic is not an underestimate.
     """
     hamming_distance: int = 0
+    goal = context.goal
 
     for index in range(size * size):
         if grid[index] != goal[index] and grid[index] != 0:
@@ -50,21 +51,22 @@ def generate_hamming_distance(
 
 
 def generate_manhattan_distance(
-    size: int, grid: tuple[int, ...], goal: tuple[int, ...]
+    size: int, grid: tuple[int, ...], context: GoalContext
 ) -> int:
     """
     The Manhattan Distance is the sum of the minimal number of moves necessary
     for each tile to get to its final position.
 
+    The goal row and column of each tile are looked up in the goal context.
     The blank tile is ignored, to ensure that this heuristic is not an underestimate.
     """
     manhattan_distance: int = 0
+    goal_rows, goal_cols = context.goal_rows, context.goal_cols
 
-    for index in range(size * size):
-        if grid[index] != goal[index] and grid[index] != 0:
-            goal_tile = goal.index(grid[index])
-            manhattan_distance += abs(index % size - goal_tile % size) + abs(
-                index // size - goal_tile // size
+    for index, tile in enumerate(grid):
+        if tile != 0:
+            manhattan_distance += abs(index % size - goal_cols[tile]) + abs(
+                index // size - goal_rows[tile]
             )
 
     return manhattan_distance
@@ -114,8 +116,21 @@ def get_conflicts_in_line(
     return conflicts_in_line
 
 
+def limit_conflicts_cache(maxsize: int) -> None:
+    """
+    The unbounded `@cache` of `get_conflicts_in_line()` is fine for a single search,
+    but grows with every puzzle in a long-running process (see `server.py`):
+    there, it's replaced by a cache keeping only the `maxsize` most recent lines.
+    The recursion goes through the module-level name, so it uses the new cache too.
+    """
+    global get_conflicts_in_line  # pylint: disable=global-statement,invalid-name
+    get_conflicts_in_line = lru_cache(maxsize=maxsize)(
+        get_conflicts_in_line.__wrapped__
+    )
+
+
 def generate_linear_conflicts(
-    size: int, grid: tuple[int, ...], goal: tuple[int, ...]
+    size: int, grid: tuple[int, ...], context: GoalContext
 ) -> int:
     """
     Two tiles tj and tk are in linear conflict if (cumulatively):
@@ -124,31 +139,19 @@ def generate_linear_conflicts(
     - tj is to the right of tk and its goal is to the left of tk's (or vice versa)
 
     Linear conflict is combined with the Manhattan Distance to get h(n).
+    The lines of the goal come from the goal context.
 
     The blank tile is ignored, to ensure that this heuristic is not an underestimate.
     """
     linear_conflicts: int = 0
-    manhattan_distance: int = generate_manhattan_distance(size, grid, goal)
-
-    grid_columns: list[list[int]] = [[] for x in range(size)]
-    goal_columns: list[list[int]] = [[] for x in range(size)]
-    grid_rows: list[list[int]] = [[] for y in range(size)]
-    goal_rows: list[list[int]] = [[] for y in range(size)]
-
-    for row in range(size):
-        for col in range(size):
-            index = col + (row * size)
-            grid_columns[col].append(grid[index])
-            goal_columns[col].append(goal[index])
-            grid_rows[row].append(grid[index])
-            goal_rows[row].append(goal[index])
+    manhattan_distance: int = generate_manhattan_distance(size, grid, context)
 
     for i in range(size):
         linear_conflicts += get_conflicts_in_line(
-            size, tuple(grid_columns[i]), tuple(goal_columns[i])
+            size, grid[i::size], context.goal_col_lines[i]
         )
         linear_conflicts += get_conflicts_in_line(
-            size, tuple(grid_rows[i]), tuple(goal_rows[i])
+            size, grid[i * size : (i + 1) * size], context.goal_row_lines[i]
         )
 
     return (linear_conflicts * 2) + manhattan_distance
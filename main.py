@@ -9,13 +9,17 @@ The puzzle can be given in a file or generated by the program itself.
 import argparse
 import random
 import sys
+import tempfile
 import time
 
+from typing import Optional
+from checkpoint import Checkpointer, SearchState, load_checkpoint
 from dataclass import Puzzle
+from engines import SolverOptions, run_engine
 from heuristics import select_heuristic
 from parsing import parsing_main
 from solvability import check_solvability
-from a_star import solve
+from a_star import print_solution
 from visualiser import results_visualiser
 
 
@@ -34,6 +38,106 @@ def generate_grid(size: int, shape: str) -> Puzzle:
     return puzzle
 
 
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parses the command line arguments
+    """
+    parser = argparse.ArgumentParser()
+    file_or_size = parser.add_mutually_exclusive_group(required=True)
+    file_or_size.add_argument(
+        "-f", "--file", help="the .txt puzzle to be solved", type=open
+    )
+    file_or_size.add_argument(
+        "-s",
+        "--size",
+        help="the size of the puzzle to be generated",
+        type=int,
+        choices=range(1, 8),
+    )
+    file_or_size.add_argument(
+        "--resume", help="resume the search saved in a checkpoint", metavar="FILE"
+    )
+    parser.add_argument(
+        "--heuristic",
+        type=str,
+        help="the heuristic used to help solve the puzzle",
+        choices=("uniform", "hamming", "manhattan", "linear"),
+        default="manhattan",
+    )
+    parser.add_argument(
+        "-g",
+        "--greedy",
+        help="make the search greedy (ignore path cost)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--shape",
+        type=str,
+        help="the shape of the goal",
+        choices=("ascending", "descending", "spiral", "random"),
+        default="spiral",
+    )
+    parser.add_argument(
+        "-v", "--visualiser", help="enable the visualiser", action="store_true"
+    )
+    parser.add_argument(
+        "--autoplay",
+        help="start playing the solution in the visualiser",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--speed",
+        help="the number of moves per second when playing, from 1 to 60 (default: 5)",
+        type=int,
+        choices=range(1, 61),
+        metavar="SPEED",
+        default=5,
+    )
+    parser.add_argument(
+        "--replay",
+        help="open the moves in FILE (eg ULDR) in the visualiser, without solving",
+        metavar="FILE",
+        type=open,
+    )
+    parser.add_argument(
+        "--external",
+        help="keep the search on disk, in a temporary directory inside DIR",
+        metavar="DIR",
+        nargs="?",
+        const=tempfile.gettempdir(),
+    )
+    parser.add_argument(
+        "--streaming",
+        help="free the expanded nodes, and rebuild the path from the moves",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="periodically save the search to FILE (default with --resume: FILE)",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        help="the number of seconds between two checkpoints (default: 60)",
+        type=float,
+        default=60.0,
+    )
+    parser.add_argument(
+        "--vectorized",
+        help="compute the heuristic with NumPy (only faster with --external)",
+        action="store_true",
+    )
+    args = parser.parse_args()
+    if args.external and (args.checkpoint or args.resume):
+        parser.error("checkpoints are not available with --external")
+    if args.external and args.greedy:
+        parser.error("greedy search is not available with --external")
+    if args.streaming and (args.external or args.checkpoint or args.resume):
+        parser.error("--streaming can't be combined with --external or checkpoints")
+
+    return args
+
+
 def main() -> None:
     """
     Where the magic happens:
@@ -46,64 +150,78 @@ def main() -> None:
     """
     try:
         time_at_beginning = time.process_time()
-        parser = argparse.ArgumentParser()
-        file_or_size = parser.add_mutually_exclusive_group(required=True)
-        file_or_size.add_argument(
-            "-f", "--file", help="the .txt puzzle to be solved", type=open
-        )
-        file_or_size.add_argument(
-            "-s",
-            "--size",
-            help="the size of the puzzle to be generated",
-            type=int,
-            choices=range(1, 8),
-        )
-        parser.add_argument(
-            "--heuristic",
-            type=str,
-            help="the heuristic used to help solve the puzzle",
-            choices=("uniform", "hamming", "manhattan", "linear"),
-            default="manhattan",
-        )
-        parser.add_argument(
-            "-g",
-            "--greedy",
-            help="make the search greedy (ignore path cost)",
-            action="store_true",
-        )
-        parser.add_argument(
-            "--shape",
-            type=str,
-            help="the shape of the goal",
-            choices=("ascending", "descending", "spiral", "random"),
-            default="spiral",
-        )
-        parser.add_argument(
-            "-v", "--visualiser", help="enable the visualiser", action="store_true"
-        )
-        args = parser.parse_args()
+        args = parse_arguments()
     except OSError as exc:
         sys.exit(f"\033[31;1mError when parsing the command-line: {exc}\033[m")
 
     try:
         puzzle: Puzzle
-        if args.file:
+        resume: Optional[SearchState] = None
+        if args.resume:
+            puzzle, args.heuristic, args.greedy, resume = load_checkpoint(args.resume)
+        elif args.file:
             with open(args.file.name, "r") as file:
                 file_content = file.read()
             puzzle = parsing_main(file_content, args.shape)
         else:
             puzzle = generate_grid(args.size, args.shape)
-        puzzle.heuristic = select_heuristic(args.heuristic)
-        time_to_solve, solution = solve(puzzle, args.greedy)
-        time_at_end = time.process_time()
-        print(
-            f"""Time to solve = \033[36;1m{round(time_to_solve, 3)
-                }s\033[m | Total execution time = \033[36;1m{
-                round(time_at_end - time_at_beginning, 3)}s\033[m"""
-        )
-        if args.visualiser:
+        if args.vectorized:
+            # NumPy is an optional dependency, only needed for this flag
+            # pylint: disable=import-outside-toplevel
+            from vectorized_heuristics import VectorizedHeuristic
+
+            puzzle.heuristic = VectorizedHeuristic(args.heuristic)
+        else:
+            puzzle.heuristic = select_heuristic(args.heuristic)
+        if args.replay:
+            with open(args.replay.name, "r") as file:
+                moves = "".join(file.read().split())
+        else:
+            checkpointer: Optional[Checkpointer] = None
+            if args.checkpoint or args.resume:
+                checkpointer = Checkpointer(
+                    args.checkpoint or args.resume,
+                    args.heuristic,
+                    args.greedy,
+                    args.checkpoint_interval,
+                )
+            options = SolverOptions(
+                args.greedy,
+                directory=args.external,
+                checkpointer=checkpointer,
+                resume=resume,
+            )
+            engine = "streaming" if args.streaming else "astar"
+            result = run_engine(
+                "external" if args.external else engine, puzzle, options
+            )
+            print_solution(
+                puzzle.size,
+                puzzle.start,
+                result.solution_moves,
+                result.time_complexity,
+                result.size_complexity,
+            )
+            time_at_end = time.process_time()
+            print(
+                f"""Time to solve = \033[36;1m{round(result.time_to_solve, 3)
+                    }s\033[m | Total execution time = \033[36;1m{
+                    round(time_at_end - time_at_beginning, 3)}s\033[m"""
+            )
+            print(
+                f"Memory peak = \033[36;1m{result.memory_peak / 2 ** 20:,.1f} MiB\033[m"
+            )
+            moves = result.solution_moves
+        if args.visualiser or args.replay:
             results_visualiser(
-                puzzle.size, solution, args.heuristic, args.shape, args.greedy
+                puzzle.size,
+                puzzle.start,
+                moves,
+                args.heuristic,
+                args.shape,
+                args.greedy,
+                args.autoplay,
+                args.speed,
             )
     except Exception as exc:  # pylint: disable=broad-except
         sys.exit(f"\033[31;1mError when processing the grid: {exc}\033[m")
@@ -0,0 +1,63 @@
+"""
+A solution can be stored compactly as a string of moves of the blank tile:
+L = left, R = right, U = up, D = down (eg "ULDR").
+The code of a move is the index of its letter in `MOVE_LETTERS`,
+and `NO_MOVE` is the code of the (missing) move leading to the starting grid.
+"""
+
+from typing import Iterator
+
+MOVE_LETTERS = "LRUD"
+NO_MOVE = 255
+OPPOSITE_MOVES = {"L": "R", "R": "L", "U": "D", "D": "U"}
+
+
+def get_move_offsets(size: int) -> tuple[int, ...]:
+    """
+    Returns how much the index of the blank tile changes for each move,
+    in the same order as `MOVE_LETTERS`
+    """
+    return (-1, +1, -size, +size)
+
+
+def apply_move(size: int, grid: list[int], blank: int, letter: str) -> int:
+    """
+    Moves the blank tile of the grid (in place) and returns its new position
+    """
+    if letter not in MOVE_LETTERS:
+        raise ValueError(f"'{letter}' is not a valid move")
+    offset = get_move_offsets(size)[MOVE_LETTERS.index(letter)]
+    next_blank = blank + offset
+    if not 0 <= next_blank < size * size or (
+        abs(offset) == 1 and next_blank // size != blank // size
+    ):
+        raise ValueError(f"the blank tile cannot move {letter} from {blank}")
+
+    grid[blank], grid[next_blank] = grid[next_blank], 0
+    return next_blank
+
+
+def solution_to_moves(size: int, solution: list[tuple[int, ...]]) -> str:
+    """
+    Converts a list of grids into the string of moves between them
+    """
+    offsets = get_move_offsets(size)
+    blanks = [grid.index(0) for grid in solution]
+    return "".join(
+        MOVE_LETTERS[offsets.index(blank - previous_blank)]
+        for previous_blank, blank in zip(blanks, blanks[1:])
+    )
+
+
+def replay_moves(
+    size: int, start: tuple[int, ...], moves: str
+) -> Iterator[tuple[int, ...]]:
+    """
+    Lazily generates all the grids of a solution, from its starting grid and moves
+    """
+    grid = list(start)
+    blank = grid.index(0)
+    yield start
+    for letter in moves:
+        blank = apply_move(size, grid, blank, letter)
+        yield tuple(grid)
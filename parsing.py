@@ -6,6 +6,8 @@ Then the formatting of the puzzle is checked.
 
 import itertools
 import sys
+
+from functools import cache
 import lark
 
 from dataclass import Puzzle
@@ -43,12 +45,13 @@ class TreeToPuzzle(lark.visitors.Transformer):  # type: ignore
     puzzle = tuple
 
 
-def parsing(file_content: str) -> tuple[int, list[list[int]]]:
+@cache
+def get_grammar() -> lark.Lark:
     """
-    Combines an abstract grammar with the Transformer to easily get a tuple
-    containing the size and the grid of the puzzle.
+    Builds the parser from the abstract grammar.
+    Building it is comparatively slow, so it's only done once per process.
     """
-    grammar = lark.Lark(
+    return lark.Lark(
         r"""
     puzzle: size grid
 
@@ -69,7 +72,13 @@ def parsing(file_content: str) -> tuple[int, list[list[int]]]:
         start="puzzle",
     )
 
-    tree = grammar.parse(file_content)
+
+def parsing(file_content: str) -> tuple[int, list[list[int]]]:
+    """
+    Combines an abstract grammar with the Transformer to easily get a tuple
+    containing the size and the grid of the puzzle.
+    """
+    tree = get_grammar().parse(file_content)
     puzzle: tuple[int, list[list[int]]] = TreeToPuzzle().transform(tree)
     return puzzle
 
@@ -5,29 +5,56 @@ https://projects.intra.42.fr/uploads/document/document/2630/npuzzle-gen.py
 I simply made it work with python3 and cleaned it a bit.
 """
 
+import os
 import sys
 import argparse
 import random
 
-def make_puzzle(size, solvable, iterations):
-    def swap_empty(p):
-        idx = p.index(0)
+# The longest optimal solution of the sizes for which it is known
+DIAMETERS = {3: 31, 4: 80}
+# The number of puzzles thrown away in a row before giving up on a target
+MAX_ATTEMPTS = 1000
+# The default number of nodes --exact may expand to solve a candidate
+MAX_NODES = 500000
+
+def make_neighbours(size):
+    """
+    For each position of the empty tile, the positions it can be swapped with
+    """
+    neighbours = []
+    for idx in range(size * size):
         poss = []
         if idx % size > 0:
             poss.append(idx - 1)
         if idx % size < size - 1:
             poss.append(idx + 1)
-        if idx / size > 0 and idx - size >= 0:
+        if idx >= size:
             poss.append(idx - size)
-        if idx / size < size - 1:
+        if idx < size * (size - 1):
             poss.append(idx + size)
-        swi = random.choice(poss)
+        neighbours.append(tuple(poss))
+    return neighbours
+
+def random_walk(p, neighbours, iterations):
+    """
+    Moves the empty tile randomly, tracking its position instead of searching for it.
+    The move undoing the previous one is never picked, so that no step is wasted.
+    """
+    choice = random.choice
+    idx = p.index(0)
+    prev = -1
+    for _ in range(iterations):
+        poss = neighbours[idx]
+        swi = choice(poss)
+        while swi == prev:
+            swi = choice(poss)
         p[idx] = p[swi]
         p[swi] = 0
+        prev, idx = idx, swi
 
+def make_puzzle(size, solvable, iterations, neighbours=None):
     p = make_goal(size)
-    for _ in range(iterations):
-        swap_empty(p)
+    random_walk(p, neighbours or make_neighbours(size), iterations)
 
     if not solvable:
         if p[0] == 0 or p[1] == 0:
@@ -37,6 +64,85 @@ def make_puzzle(size, solvable, iterations):
 
     return p
 
+def make_difficulty(size, exact, max_nodes=MAX_NODES):
+    """
+    Returns a function estimating the length of the optimal solution of a puzzle
+    with the Linear Conflicts heuristic (a lower bound),
+    or computing it exactly with A* if `exact` is True.
+    The exact length is None when A* needs more than `max_nodes` nodes.
+    """
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from a_star import SearchBudgetExceeded, search
+    from dataclass import Puzzle, get_goal_context
+    from heuristics import generate_linear_conflicts
+
+    context = get_goal_context(size, "spiral")
+
+    def difficulty(p):
+        estimate = generate_linear_conflicts(size, tuple(p), context)
+        if not exact:
+            return estimate
+        puzzle = Puzzle(size, tuple(p), "spiral")
+        puzzle.heuristic = generate_linear_conflicts
+        try:
+            return len(search(puzzle, False, max_nodes)[0]) - 1
+        except SearchBudgetExceeded:
+            return None
+
+    return difficulty
+
+def make_corpus(size, count, solvable, iterations, min_moves, max_moves, exact,
+        max_nodes=MAX_NODES):
+    """
+    Generates `count` puzzles, whether they are solvable,
+    and their difficulty if a target is given.
+    When targeting a difficulty, the length of each random walk is picked
+    between `min_moves` and 3 * `max_moves` (a walk of n moves can't be harder
+    than n) and puzzles outside of the target are thrown away, as well as the
+    ones that can't be solved in `max_nodes` nodes with `exact`.
+    Raises a RuntimeError after `MAX_ATTEMPTS` puzzles in a row were thrown away.
+    """
+    neighbours = make_neighbours(size)
+    targeted = min_moves is not None or max_moves is not None
+    if not targeted:
+        for _ in range(count):
+            is_solvable = solvable()
+            yield make_puzzle(size, is_solvable, iterations, neighbours), is_solvable, None
+        return
+
+    difficulty = make_difficulty(size, exact, max_nodes)
+    estimate = make_difficulty(size, False)
+    min_moves = min_moves or 0
+    generated = 0
+    attempts = 0
+    while generated < count:
+        if attempts == MAX_ATTEMPTS:
+            raise RuntimeError("No puzzle in the target was found after %d attempts" % attempts)
+        attempts += 1
+        walk = iterations
+        if max_moves is not None:
+            walk = random.randint(min_moves, 3 * max_moves)
+        p = make_puzzle(size, True, walk, neighbours)
+        # The estimate never overestimates: no need to solve if it's already too high
+        if max_moves is not None and estimate(p) > max_moves:
+            continue
+        moves = difficulty(p)
+        if moves is None or moves < min_moves or (max_moves is not None and moves > max_moves):
+            continue
+        generated += 1
+        attempts = 0
+        yield p, True, moves
+
+def format_puzzle(puzzle, size, solvable, moves, exact):
+    lines = ["# This puzzle is %s" % ("solvable" if solvable else "unsolvable")]
+    if moves is not None:
+        lines.append("# %s solution length: %d moves" % ("Optimal" if exact else "Estimated", moves))
+    lines.append("%d" % size)
+    width = len(str(size * size))
+    for y in range(size):
+        lines.append("".join(" %s" % str(puzzle[x + y * size]).rjust(width) for x in range(size)))
+    return "\n".join(lines) + "\n"
+
 def make_goal(size):
     ts = size * size
     puzzle = [-1 for i in range(ts)]
@@ -72,10 +178,20 @@ if __name__ == "__main__":
     parser.add_argument("-u", "--unsolvable", action="store_true", default=False,
         help="Forces generation of an unsolvable puzzle")
     parser.add_argument("-i", "--iterations", type=int, default=10000, help="Number of passes")
+    parser.add_argument("-n", "--count", type=int, default=1, help="Number of puzzles to generate")
+    parser.add_argument("-o", "--output", help="Directory where each puzzle is written to its own file "
+        "(required to generate more than one puzzle)")
+    parser.add_argument("--min-moves", type=int, help="Minimal length of the solution")
+    parser.add_argument("--max-moves", type=int, help="Maximal length of the solution")
+    parser.add_argument("--exact", action="store_true", default=False,
+        help="Target the optimal solution length (solved with A*) instead of its estimate")
+    parser.add_argument("--max-nodes", type=int, default=MAX_NODES,
+        help="With --exact, skip the puzzles needing more nodes to be solved (default: %d)" % MAX_NODES)
+    parser.add_argument("--seed", type=int, help="Seed of the random generator, for reproducible corpora")
 
     args = parser.parse_args()
 
-    random.seed()
+    random.seed(args.seed)
 
     if args.solvable and args.unsolvable:
         print("Can't be both solvable AND unsolvable, dummy !")
@@ -85,21 +201,48 @@ if __name__ == "__main__":
         print("Can't generate a puzzle with size lower than 2. It says so in the help. Dummy.")
         sys.exit(1)
 
+    if args.count > 1 and not args.output:
+        print("Several puzzles need an output directory (-o), dummy !")
+        sys.exit(1)
+
+    if args.max_nodes < 1:
+        print("A* needs at least one node to solve a puzzle, dummy !")
+        sys.exit(1)
+
+    if args.min_moves is not None or args.max_moves is not None:
+        if args.unsolvable:
+            print("An unsolvable puzzle has no solution length, dummy !")
+            sys.exit(1)
+        args.solvable = True
+        if args.min_moves is not None and args.max_moves is not None and args.min_moves > args.max_moves:
+            print("The minimal solution length can't be above the maximal one, dummy !")
+            sys.exit(1)
+        if args.min_moves is not None and args.min_moves > DIAMETERS.get(args.size, args.min_moves):
+            print("No puzzle of size %d needs more than %d moves, dummy !" % (args.size, DIAMETERS[args.size]))
+            sys.exit(1)
+
     if not args.solvable and not args.unsolvable:
-        IS_SOLVABLE = random.choice([True, False])
+        IS_SOLVABLE = lambda: random.choice([True, False])
     elif args.solvable:
-        IS_SOLVABLE = True
+        IS_SOLVABLE = lambda: True
     elif args.unsolvable:
-        IS_SOLVABLE = False
+        IS_SOLVABLE = lambda: False
 
     size = args.size
 
-    puzzle = make_puzzle(size, IS_SOLVABLE, args.iterations)
-
-    LEN = len(str(size * size))
-    print("# This puzzle is %s" % ("solvable" if IS_SOLVABLE else "unsolvable"))
-    print("%d" % size)
-    for y in range(size):
-        for x in range(size):
-            print(" %s" % (str(puzzle[x + y * size]).rjust(LEN)), end='')
-        print("")
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    corpus = make_corpus(size, args.count, IS_SOLVABLE, args.iterations,
+        args.min_moves, args.max_moves, args.exact, args.max_nodes)
+    try:
+        for index, (puzzle, solvable, moves) in enumerate(corpus):
+            text = format_puzzle(puzzle, size, solvable, moves, args.exact)
+            if args.output:
+                with open(os.path.join(args.output, "%d-random_%d.txt" % (size, index + 1)), "w") as f:
+                    f.write(text)
+            else:
+                print(text, end="")
+    except RuntimeError as exc:
+        print(exc)
+        sys.exit(1)
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3.9
+
+"""
+A long-running solver service, to avoid paying for the interpreter startup,
+the grammar construction and cold heuristic caches on every puzzle.
+
+Puzzles are accepted over a local Unix socket (one JSON request per line)
+and/or over HTTP (`POST /solve` with a JSON body, `GET /metrics`).
+Connections are handled with asyncio and the solves run in a pool of worker
+processes, which keep their grammar and heuristic caches between requests.
+
+A solve request looks like this (only `puzzle` is required):
+{"puzzle": "3\\n1 2 3\\n8 0 4\\n7 6 5\\n", "engine": "astar", "heuristic": "linear",
+ "shape": "spiral", "greedy": false, "max_nodes": 100000, "time_limit": 5}
+On the Unix socket, {"command": "metrics"} returns the metrics.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import signal
+import sys
+import time
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from a_star import SearchBudgetExceeded
+from engines import ENGINES, SolverOptions, run_engine
+from heuristics import limit_conflicts_cache, select_heuristic
+from parsing import get_grammar, parsing_main
+
+# About 350 MB of memory per worker for the in-memory A* on 15-puzzles
+DEFAULT_MAX_NODES = 500_000
+DEFAULT_TIME_LIMIT = 30.0
+# About 25 MB of memory per worker for the Linear Conflicts cache
+CONFLICTS_CACHE_SIZE = 1 << 17
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 422: "Unprocessable"}
+# The same choices as the flags of main.py
+HEURISTICS = ("uniform", "hamming", "manhattan", "linear")
+SHAPES = ("ascending", "descending", "spiral", "random")
+
+
+def warm_up_worker() -> None:
+    """
+    Called once when each worker process starts,
+    so that the first request doesn't have to build the grammar.
+    The workers live as long as the server, so their Linear Conflicts cache is bounded.
+
+    The worker is forked from the event loop, and inherits its SIGTERM handler:
+    without resetting it, stopping a worker would also stop the server.
+    """
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    get_grammar()
+    limit_conflicts_cache(CONFLICTS_CACHE_SIZE)
+
+
+def get_budget(requested: Any, limit: Optional[float]) -> Optional[float]:
+    """
+    The budget of a request can be lowered by the client, but never raised
+    above the limit set when starting the server.
+    It must be a positive number: `min()` with NaN would remove the limit.
+    """
+    if requested is None:
+        return limit
+    budget = float(requested)
+    if not math.isfinite(budget) or budget <= 0:
+        raise ValueError(f"the budget must be a positive number, not {requested!r}")
+    if limit is None:
+        return budget
+    return min(budget, limit)
+
+
+def get_choice(
+    request: dict[str, Any], key: str, choices: tuple[str, ...], default: str
+) -> str:
+    """
+    An unknown value must not silently fall back to the default
+    (nor add an entry to the goal context cache for every unknown shape)
+    """
+    value = request.get(key, default)
+    if not isinstance(value, str) or value not in choices:
+        raise ValueError(f"'{key}' must be one of {', '.join(choices)}, not {value!r}")
+    return value
+
+
+def solve_request(
+    request: dict[str, Any], max_nodes: Optional[float], time_limit: Optional[float]
+) -> dict[str, Any]:
+    """
+    Parses and solves a single puzzle (this runs in a worker process).
+
+    The parsing functions call `sys.exit()` on invalid puzzles:
+    that must not kill the worker, so it's turned back into an error message.
+    """
+    try:
+        shape = get_choice(request, "shape", SHAPES, "spiral")
+        heuristic = get_choice(request, "heuristic", HEURISTICS, "manhattan")
+        engine = get_choice(request, "engine", tuple(ENGINES), "astar")
+        greedy = request.get("greedy", False)
+        if not isinstance(greedy, bool):
+            raise ValueError(f"'greedy' must be true or false, not {greedy!r}")
+        puzzle = parsing_main(str(request["puzzle"]), shape)
+        puzzle.heuristic = select_heuristic(heuristic)
+        node_budget = get_budget(request.get("max_nodes"), max_nodes)
+        options = SolverOptions(
+            greedy,
+            None if node_budget is None else int(node_budget),
+            get_budget(request.get("time_limit"), time_limit),
+        )
+        result = run_engine(engine, puzzle, options)
+    except SystemExit as exc:
+        return {"status": "error", "error": re.sub(r"\033\[[\d;]*m", "", str(exc.code))}
+    except SearchBudgetExceeded as exc:
+        return {"status": "budget_exceeded", "error": str(exc)}
+    except Exception as exc:  # pylint: disable=broad-except
+        return {"status": "error", "error": f"{type(exc).__name__}: {exc}"}
+
+    return {
+        "status": "ok",
+        "moves": result.moves,
+        "solution": list(result.solution()),
+        "time_complexity": result.time_complexity,
+        "size_complexity": result.size_complexity,
+        "time_to_solve": round(result.time_to_solve, 6),
+    }
+
+
+@dataclass
+class Metrics:
+    """
+    Throughput and latency of the server.
+    Latency percentiles are computed over the last 1000 requests.
+    """
+
+    started_at: float = field(default_factory=time.monotonic)
+    requests: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+
+    def record(self, latency: float, success: bool) -> None:
+        """
+        Stores the result of a finished request
+        """
+        self.requests += 1
+        if not success:
+            self.errors += 1
+        self.latencies.append(latency)
+
+    def report(self) -> dict[str, Any]:
+        """
+        Returns all the metrics, with latencies in milliseconds
+        """
+        uptime = time.monotonic() - self.started_at
+        latencies = sorted(self.latencies)
+        report: dict[str, Any] = {
+            "uptime": round(uptime, 3),
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "throughput": round(self.requests / uptime, 3) if uptime else 0.0,
+        }
+        if latencies:
+            report["latency_ms"] = {
+                "mean": round(1000 * sum(latencies) / len(latencies), 3),
+                "p50": round(1000 * latencies[len(latencies) // 2], 3),
+                "p95": round(1000 * latencies[int(len(latencies) * 0.95)], 3),
+                "max": round(1000 * latencies[-1], 3),
+            }
+        return report
+
+
+async def read_http_headers(reader: asyncio.StreamReader) -> dict[str, str]:
+    """
+    Reads the headers of an HTTP request, with lowercase names
+    """
+    headers: dict[str, str] = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+class SolverServer:
+    """
+    Dispatches the requests coming from both transports to the worker pool
+    """
+
+    def __init__(
+        self, workers: int, max_nodes: Optional[int], time_limit: Optional[float]
+    ) -> None:
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(workers, initializer=warm_up_worker)
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.metrics = Metrics()
+
+    def restart_workers(self, broken_executor: ProcessPoolExecutor) -> None:
+        """
+        Replaces the pool once one of its workers died (eg killed for using too
+        much memory): a broken pool rejects every request sent to it afterwards.
+        The requests that were running in it all fail, but only one restarts it.
+        """
+        if self.executor is broken_executor:
+            self.executor = ProcessPoolExecutor(
+                self.workers, initializer=warm_up_worker
+            )
+            broken_executor.shutdown(wait=False)
+
+    async def solve(self, request: Any) -> dict[str, Any]:
+        """
+        Sends a request to a worker and records how long it took to answer
+        """
+        time_before_request = time.monotonic()
+        self.metrics.in_flight += 1
+        try:
+            if not isinstance(request, dict) or "puzzle" not in request:
+                response = {"status": "error", "error": "missing 'puzzle' field"}
+            else:
+                executor = self.executor
+                try:
+                    response = await asyncio.get_running_loop().run_in_executor(
+                        executor,
+                        solve_request,
+                        request,
+                        self.max_nodes,
+                        self.time_limit,
+                    )
+                except BrokenProcessPool:
+                    self.restart_workers(executor)
+                    response = {
+                        "status": "error",
+                        "error": "the worker solving the puzzle was killed",
+                    }
+        finally:
+            self.metrics.in_flight -= 1
+        self.metrics.record(
+            time.monotonic() - time_before_request, response["status"] == "ok"
+        )
+        return response
+
+    async def handle_unix(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Unix socket transport: one JSON request per line, one JSON response per line
+        """
+        while line := await reader.readline():
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as exc:
+                response = {"status": "error", "error": f"invalid JSON: {exc}"}
+            else:
+                if isinstance(request, dict) and request.get("command") == "metrics":
+                    response = self.metrics.report()
+                else:
+                    response = await self.solve(request)
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        writer.close()
+
+    async def route_http(
+        self, method: str, path: str, body: bytes
+    ) -> tuple[int, dict[str, Any]]:
+        """
+        Returns the HTTP status and the JSON response for a given request
+        """
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics.report()
+        if method == "POST" and path == "/solve":
+            try:
+                request = json.loads(body)
+            except json.JSONDecodeError as exc:
+                return 400, {"status": "error", "error": f"invalid JSON: {exc}"}
+            response = await self.solve(request)
+            return (200 if response["status"] == "ok" else 422), response
+        return 404, {"status": "error", "error": "not found"}
+
+    async def handle_http(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        A minimal HTTP/1.1 transport, with keep-alive so that clients sending
+        many small requests don't have to reconnect every time
+        """
+        while request_line := await reader.readline():
+            headers = await read_http_headers(reader)
+            keep_alive = headers.get("connection", "").lower() != "close"
+            try:
+                content_length = int(headers.get("content-length", 0))
+            except ValueError:
+                content_length = -1
+
+            if content_length < 0:
+                # The end of the body is unknown, so the connection can't be reused
+                status = 400
+                response = {"status": "error", "error": "invalid Content-Length"}
+                keep_alive = False
+            else:
+                try:
+                    body = await reader.readexactly(content_length)
+                except asyncio.IncompleteReadError:
+                    # The client disconnected before sending the whole body
+                    break
+                method, path, *_ = request_line.decode("latin-1").split() + ["", ""]
+                status, response = await self.route_http(method, path, body)
+
+            payload = json.dumps(response).encode()
+            writer.write(
+                f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                + payload
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+        writer.close()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    """
+    Starts the requested transports and serves until interrupted
+    """
+    solver_server = SolverServer(args.workers, args.max_nodes, args.time_limit)
+    servers = []
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        servers.append(
+            await asyncio.start_unix_server(solver_server.handle_unix, args.socket)
+        )
+        print(f"Listening on unix socket \033[36;1m{args.socket}\033[m")
+    if args.port:
+        servers.append(
+            await asyncio.start_server(solver_server.handle_http, args.host, args.port)
+        )
+        print(f"Listening on \033[36;1mhttp://{args.host}:{args.port}\033[m")
+
+    serving = asyncio.gather(*(server.serve_forever() for server in servers))
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, serving.cancel)
+    try:
+        await serving
+    except asyncio.CancelledError:
+        pass
+    finally:
+        solver_server.executor.shutdown(cancel_futures=True)
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+def main() -> None:
+    """
+    Parses the command line arguments and starts the server
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", help="path of the Unix socket to listen on")
+    parser.add_argument("--port", help="port to listen on for HTTP", type=int)
+    parser.add_argument("--host", help="host to bind for HTTP", default="127.0.0.1")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="number of worker processes",
+        type=int,
+        default=os.cpu_count() or 1,
+    )
+    parser.add_argument(
+        "--max-nodes",
+        help=f"maximum number of nodes expanded per request (default: {DEFAULT_MAX_NODES:,})",
+        type=int,
+        default=DEFAULT_MAX_NODES,
+    )
+    parser.add_argument(
+        "--time-limit",
+        help=f"maximum CPU time (in seconds) per request (default: {DEFAULT_TIME_LIMIT})",
+        type=float,
+        default=DEFAULT_TIME_LIMIT,
+    )
+    parser.add_argument(
+        "--unbounded",
+        help="don't limit the requests (a single one can use all the memory)",
+        action="store_true",
+    )
+    args = parser.parse_args()
+    if not args.socket and not args.port:
+        parser.error("at least one of --socket or --port is required")
+    if args.unbounded:
+        args.max_nodes, args.time_limit = None, None
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
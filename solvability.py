@@ -14,7 +14,7 @@ def get_inversion_sum(puzzle: Puzzle) -> int:
 
     for index, number in enumerate(puzzle.start):
         previous_numbers_in_grid = puzzle.start[:index]
-        previous_numbers_in_goal = puzzle.goal[: puzzle.goal.index(number)]
+        previous_numbers_in_goal = puzzle.goal[: puzzle.context.goal_positions[number]]
         permutation_inversions = [
             x for x in previous_numbers_in_goal if x not in previous_numbers_in_grid
         ]
@@ -32,8 +32,8 @@ def check_solvability(puzzle: Puzzle) -> bool:
 
     zero_in_grid_x = puzzle.start.index(0) % puzzle.size
     zero_in_grid_y = puzzle.start.index(0) // puzzle.size
-    zero_in_goal_x = puzzle.goal.index(0) % puzzle.size
-    zero_in_goal_y = puzzle.goal.index(0) // puzzle.size
+    zero_in_goal_x = puzzle.context.goal_cols[0]
+    zero_in_goal_y = puzzle.context.goal_rows[0]
     diff_zero = abs(zero_in_grid_x - zero_in_goal_x) + abs(
         zero_in_grid_y - zero_in_goal_y
     )
@@ -0,0 +1,57 @@
+"""
+The vectorized heuristics must always give the same results
+as the reference implementation of `heuristics.py`.
+Run with `python -m unittest`.
+"""
+
+import random
+import unittest
+
+from dataclass import get_goal_context
+from heuristics import select_heuristic
+
+try:
+    from vectorized_heuristics import VectorizedHeuristic
+except ImportError as exc:
+    raise unittest.SkipTest(f"NumPy is not installed: {exc}")
+
+SIZES = range(1, 7)
+SHAPES = ("ascending", "descending", "spiral", "random")
+HEURISTICS = ("uniform", "hamming", "manhattan", "linear")
+BOARDS_PER_CASE = 50
+
+
+class TestVectorizedHeuristics(unittest.TestCase):
+    """
+    Compares both implementations on random boards
+    """
+
+    def test_same_results_as_reference(self) -> None:
+        """
+        Every size, shape and heuristic, on the same batch of boards
+        """
+        generator = random.Random(42)
+        for size in SIZES:
+            for shape in SHAPES:
+                context = get_goal_context(size, shape)
+                grids = [
+                    tuple(generator.sample(range(size * size), size * size))
+                    for _ in range(BOARDS_PER_CASE)
+                ]
+                # The goal itself is an edge case for every heuristic
+                grids.append(context.goal)
+                for name in HEURISTICS:
+                    with self.subTest(size=size, shape=shape, heuristic=name):
+                        reference = select_heuristic(name)
+                        expected = [reference(size, grid, context) for grid in grids]
+                        vectorized = VectorizedHeuristic(name)
+                        self.assertEqual(
+                            vectorized.batch(size, grids, context), expected
+                        )
+                        self.assertEqual(
+                            vectorized(size, grids[0], context), expected[0]
+                        )
+
+
+if __name__ == "__main__":
+    unittest.main()
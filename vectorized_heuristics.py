@@ -0,0 +1,184 @@
+"""
+Vectorized versions of the heuristics (using NumPy), able to evaluate
+many grids in a single call.
+Each call has a fixed cost, so they are only faster than the reference
+with many grids at once (eg the buckets of `external_search.py`),
+not with the few children of a single node.
+
+The functions of `heuristics.py` remain the reference implementation:
+the results of both must always be identical.
+"""
+
+import itertools
+
+from functools import cache
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from dataclass import GoalContext
+from heuristics import get_conflicts_in_line
+
+IntArray = npt.NDArray[np.int64]
+BatchCallback = Callable[[int, IntArray, GoalContext], IntArray]
+
+
+def get_goal_coordinates(context: GoalContext) -> tuple[IntArray, IntArray, IntArray]:
+    """
+    Returns the lookup arrays of a goal context:
+    - the goal row of each tile (indexed by the tile number)
+    - the goal column of each tile (indexed by the tile number)
+    - the goal itself
+
+    They are built once, and stored in the context itself
+    """
+    coordinates: Optional[tuple[IntArray, IntArray, IntArray]]
+    coordinates = context.derived.get("goal_coordinates")
+    if coordinates is None:
+        coordinates = (
+            np.array(context.goal_rows, dtype=np.int64),
+            np.array(context.goal_cols, dtype=np.int64),
+            np.array(context.goal, dtype=np.int64),
+        )
+        context.derived["goal_coordinates"] = coordinates
+    return coordinates
+
+
+@cache
+def get_line_conflicts_table(size: int) -> IntArray:
+    """
+    In a given line, Linear Conflicts only depends on the order of the goal
+    positions of the tiles whose goal is in that line.
+    Each line is encoded as a number in base size + 1, one digit per tile:
+    0 if the tile doesn't belong to that line (or is blank),
+    otherwise 1 + the position of its goal in the line.
+
+    The minimal number of conflicts for every possible line is computed
+    once per size with the reference `get_conflicts_in_line()`.
+    """
+    table = np.zeros((size + 1) ** size, dtype=np.int64)
+    reference_goal = tuple(range(1, size + 1))
+    powers = [(size + 1) ** position for position in range(size)]
+
+    for tiles_in_line in range(2, size + 1):
+        for positions in itertools.combinations(range(size), tiles_in_line):
+            for ranks in itertools.permutations(reference_goal, tiles_in_line):
+                line = [0] * size
+                for position, rank in zip(positions, ranks):
+                    line[position] = rank
+                code = sum(digit * power for digit, power in zip(line, powers))
+                table[code] = get_conflicts_in_line(size, tuple(line), reference_goal)
+
+    return table
+
+
+def batch_uniform_cost(  # pylint: disable=unused-argument
+    size: int, boards: IntArray, context: GoalContext
+) -> IntArray:
+    """
+    Vectorized `generate_uniform_cost()`
+    """
+    return np.zeros(len(boards), dtype=np.int64)
+
+
+def batch_hamming_distance(  # pylint: disable=unused-argument
+    size: int, boards: IntArray, context: GoalContext
+) -> IntArray:
+    """
+    Vectorized `generate_hamming_distance()`
+    """
+    goal_array = get_goal_coordinates(context)[2]
+    misplaced: IntArray = np.count_nonzero(
+        (boards != goal_array) & (boards != 0), axis=1
+    )
+    return misplaced
+
+
+def batch_manhattan_distance(
+    size: int, boards: IntArray, context: GoalContext
+) -> IntArray:
+    """
+    Vectorized `generate_manhattan_distance()`
+    """
+    goal_rows, goal_cols, _ = get_goal_coordinates(context)
+    positions = np.arange(size * size)
+
+    distances = np.abs(goal_rows[boards] - positions // size) + np.abs(
+        goal_cols[boards] - positions % size
+    )
+    distances[boards == 0] = 0
+    manhattan_distance: IntArray = distances.sum(axis=1)
+    return manhattan_distance
+
+
+def batch_linear_conflicts(  # pylint: disable=too-many-locals
+    size: int, boards: IntArray, context: GoalContext
+) -> IntArray:
+    """
+    Vectorized `generate_linear_conflicts()`:
+    each line of each board is encoded (see `get_line_conflicts_table()`),
+    so that its number of conflicts is a single lookup.
+    """
+    goal_rows, goal_cols, _ = get_goal_coordinates(context)
+    table = get_line_conflicts_table(size)
+    positions = np.arange(size * size)
+    powers = (size + 1) ** np.arange(size)
+    tile_goal_rows = goal_rows[boards]
+    tile_goal_cols = goal_cols[boards]
+    not_blank = boards != 0
+
+    in_goal_row = not_blank & (tile_goal_rows == positions // size)
+    row_digits = np.where(in_goal_row, tile_goal_cols + 1, 0).reshape((-1, size, size))
+    row_codes = row_digits @ powers
+
+    in_goal_col = not_blank & (tile_goal_cols == positions % size)
+    col_digits = np.where(in_goal_col, tile_goal_rows + 1, 0).reshape((-1, size, size))
+    col_codes = powers @ col_digits
+
+    linear_conflicts: IntArray = table[row_codes].sum(axis=1) + table[col_codes].sum(
+        axis=1
+    )
+    return linear_conflicts * 2 + batch_manhattan_distance(size, boards, context)
+
+
+def select_batch_heuristic(arg: str) -> BatchCallback:
+    """
+    Returns the appropriate vectorized heuristic depending on the flag passed as argument
+    """
+    heuristics: dict[str, BatchCallback] = {
+        "uniform": batch_uniform_cost,
+        "hamming": batch_hamming_distance,
+        "manhattan": batch_manhattan_distance,
+        "linear": batch_linear_conflicts,
+    }
+
+    return heuristics.get(arg, batch_manhattan_distance)
+
+
+class VectorizedHeuristic:
+    """
+    Heuristic callback backed by NumPy.
+    It can be used like the reference heuristics (one grid at a time),
+    but `batch()` should be preferred to evaluate several grids at once.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.batch_heuristic = select_batch_heuristic(name)
+
+    def __call__(self, size: int, grid: tuple[int, ...], context: GoalContext) -> int:
+        return self.batch(size, [grid], context)[0]
+
+    def batch(
+        self, size: int, grids: Sequence[tuple[int, ...]], context: GoalContext
+    ) -> list[int]:
+        """
+        Returns h(n) for each of the grids, in a single NumPy call
+        """
+        if not grids:
+            return []
+        boards = np.array(grids, dtype=np.int64)
+        heuristic_costs: list[int] = self.batch_heuristic(
+            size, boards, context
+        ).tolist()
+        return heuristic_costs
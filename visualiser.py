@@ -4,6 +4,8 @@ A basic visualiser (using PySimpleGUI) to showcase the solving process of A*
 
 import PySimpleGUI as sg  # type: ignore
 
+from moves import OPPOSITE_MOVES, apply_move
+
 
 def get_heuristic_fullname(heuristic: str, greedy: bool) -> str:
     """
@@ -48,19 +50,62 @@ def generate_grid_layout(
     return layout
 
 
-def results_visualiser(
-    size: int, solution: list[tuple[int, ...]], heuristic: str, shape: str, greedy: bool
+def go_to_step(  # pylint: disable=too-many-arguments
+    size: int, grid: list[int], blank: int, step: int, target: int, moves: str
+) -> tuple[int, set[int]]:
+    """
+    Replays (or rewinds) the moves between the current step and the target step,
+    directly on the grid.
+
+    Returns the new position of the blank tile and the indexes of the tiles
+    that changed, so that only those have to be updated in the window
+    """
+    changed: set[int] = set()
+    while step < target:
+        changed.add(blank)
+        blank = apply_move(size, grid, blank, moves[step])
+        changed.add(blank)
+        step += 1
+    while step > target:
+        step -= 1
+        changed.add(blank)
+        blank = apply_move(size, grid, blank, OPPOSITE_MOVES[moves[step]])
+        changed.add(blank)
+
+    return blank, changed
+
+
+def results_visualiser(  # pylint: disable=too-many-arguments,too-many-locals
+    size: int,
+    start: tuple[int, ...],
+    moves: str,
+    heuristic: str,
+    shape: str,
+    greedy: bool,
+    autoplay: bool = False,
+    speed: int = 5,
 ) -> None:
     """
-    Opens a new window and allows the user to step through the solving process
+    Opens a new window and allows the user to step through the solving process.
+
+    The solution is given as its starting grid and its string of moves
+    (see `moves.py`): only the current grid is kept in memory,
+    and only the tiles that changed are updated in the window.
+    `speed` is the number of moves per second when playing automatically.
     """
+    grid = list(start)
+    blank = grid.index(0)
     step = 0
-    number_of_moves = len(solution)
+    number_of_moves = len(moves)
+    playing = autoplay and number_of_moves > 0
+    # Makes sure that all the moves are valid before opening the window
+    go_to_step(size, list(start), blank, 0, number_of_moves, moves)
 
     print(
         """\n\033[4mNavigate with the arrow keys:\033[m
     Left => Previous\tRight => Next
     Up => First\t\tDown => Last
+    P => Play / Pause
     """
     )
 
@@ -68,19 +113,35 @@ def results_visualiser(
     layout = [
         [
             sg.Frame(
-                f"Step {step + 1} / {number_of_moves}",
+                f"Step {step + 1} / {number_of_moves + 1}",
                 key="-FRAME-",
-                layout=generate_grid_layout(size, solution[step]),
+                layout=generate_grid_layout(size, start),
             )
         ],
         [sg.Text(f"Goal shape: {shape.capitalize()}")],
         [sg.Text(f"Heuristic: {get_heuristic_fullname(heuristic, greedy)}")],
+        [
+            sg.Slider(
+                range=(0, number_of_moves),
+                orientation="h",
+                enable_events=True,
+                disable_number_display=True,
+                key="-STEP-",
+            )
+        ],
         [
             sg.Button("First"),
             sg.Button("<", key="-PREVIOUS-"),
+            sg.Button("Pause" if playing else "Play", key="-PLAY-"),
             sg.Button(">", key="-NEXT-"),
             sg.Button("Last"),
         ],
+        [
+            sg.Text("Moves per second:"),
+            sg.Slider(
+                range=(1, 60), default_value=speed, orientation="h", key="-SPEED-"
+            ),
+        ],
     ]
 
     # Create the Window
@@ -93,26 +154,37 @@ def results_visualiser(
 
     # Event Loop to process "events"
     while True:
-        event, _ = window.read()
+        event, values = window.read(timeout=1000 / speed if playing else None)
 
         if event in (sg.WIN_CLOSED, "q", "q:24"):
             break
+        speed = int(values["-SPEED-"])
+        target = step
+        if event == sg.TIMEOUT_KEY:
+            target = step + 1
+        if event in ("-PLAY-", "p", "p:33"):
+            playing = not playing and step < number_of_moves
+        if event == "-STEP-":
+            target = int(values["-STEP-"])
         if event in ("First", "Up:38", "Up:111"):
-            step = 0
+            target = 0
         if event in ("-PREVIOUS-", "Left:37", "Left:113"):
-            if step > 0:
-                step -= 1
+            target = max(step - 1, 0)
         if event in ("-NEXT-", "Right:39", "Right:114"):
-            if step < number_of_moves - 1:
-                step += 1
+            target = min(step + 1, number_of_moves)
         if event in ("Last", "Down:40", "Down:116"):
-            step = number_of_moves - 1
-
-        window["-FRAME-"].update(f"Step {step + 1} / {number_of_moves}")
-
-        for row in range(size):
-            for col in range(size):
-                index = col + (row * size)
-                window[str(index)].update(solution[step][index])
+            target = number_of_moves
+        if target == number_of_moves:
+            playing = False
+
+        blank, changed = go_to_step(size, grid, blank, step, target, moves)
+        step = target
+        for index in changed:
+            window[str(index)].update(grid[index])
+
+        window["-FRAME-"].update(f"Step {step + 1} / {number_of_moves + 1}")
+        window["-PLAY-"].update("Pause" if playing else "Play")
+        if event != "-STEP-":
+            window["-STEP-"].update(value=step)
 
     window.close()